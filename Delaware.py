@@ -1,15 +1,18 @@
 # IMPORTANT REMINDER:
 
-# BEFORE YOU BEGIN PROCESSING, READ THE INSTRUCTIONS CAREFULLY AND DOUBLE-CHECK THAT EVERYTHING IS SET UP CORRECTLY. 
-# IF THE SETUP IS NOT DONE PROPERLY, IT WILL LEAD TO SIGNIFICANT ISSUES OR ERRORS. 
+# BEFORE YOU BEGIN PROCESSING, READ THE INSTRUCTIONS CAREFULLY AND DOUBLE-CHECK THAT EVERYTHING IS SET UP CORRECTLY.
+# IF THE SETUP IS NOT DONE PROPERLY, IT WILL LEAD TO SIGNIFICANT ISSUES OR ERRORS.
 
 import pandas as pd
 import glob
 import os
 import re
+import time
+
+from rubric_excel import loader_workers, map_script_function, open_streaming_workbook, publish, read_extract, stream_sheet
+from rubric_layout import layout_folder
+from rubric_store import as_sheet, should_write_excel
 
-# Prompt user for the base directory
-directory_path = input("Enter the base directory path: ")
 # C:\...\...\The University of Southern Mississippi\...\W Drive\Userfiles\AKale\Resource Allocation Rubric\AY_*_*
 # This takes the base file 'ET_DELAWARE_STUDY_BASE*.xlsx' (* is a wildcard)
 # This script does the following:
@@ -21,14 +24,108 @@ directory_path = input("Enter the base directory path: ")
 # Saves Results: The modified data and pivot table are saved in two locations:
 # In the OUTPUT folder.
 # In the same folder where the original files were located.
+# When run through rubric_pipeline.py the results are also handed to the next stage in memory (store).
+# When there are several base files (terms / years) they are processed in parallel, one process per file
+# (RUBRIC_LOADER_WORKERS limits how many), and a table of rows, IDs and read / process / write times per file is printed.
+# Files whose names give the same year write the same DELAWARE_{year} file, so those are processed one after another in
+# one process, and the last one is kept (as when all files are processed one after another).
+
+# Columns kept in the output, in this order (# OF COURSES TAUGHT is calculated below)
+column_order = [
+    'ID', '# OF COURSES TAUGHT', 'Class Nbr', 'Course ID', 'Section',
+    'Catalog', 'Subject', 'Career', 'Load Factor', 'Tot Enrl',
+    'Tot Hrs C', 'Tot Ghrs', 'Title', 'Min Units', 'Max Units',
+    'Instructor', 'Cls Load', 'Enrl Load', 'SCH Load',
+    'AVG_SCH', 'USM SCH Fr', 'USM SCH So', 'USM SCH Jr',
+    'USM SCH Sr', 'USM SCH Ms', 'USM SCH Sp', 'USM SCH Do',
+    'DEPT_CIP_Code', 'DEPT_CHAIR_EMPLID', 'DEPT_HEAD', 'INSTR_DEPT'
+]
+
+
+# Function to process one ET_DELAWARE_STUDY_BASE* file (run in a separate process when there are several files).
+# Returns the sheets for the next stage (None when the file could not be read) and a row for the timing table.
+def process_file(file_path, year, output_file_path, output_file_path_in_output, write_excel):
+    start_time = time.perf_counter()
+    print(f"Processing file: {file_path}")
+    timing = {'File': os.path.basename(file_path), 'Year': year, 'Rows': 0, 'IDs': 0,
+              'Read (s)': 0.0, 'Process (s)': 0.0, 'Write (s)': 0.0}
+
+    # Sheet name
+    sheet_name = 'sheet1'  # Update this if needed
+
+    # Read the Excel sheet into a DataFrame
+    try:
+        df = read_extract(file_path, columns=column_order, sheet_name=sheet_name)  # Only the output columns are parsed
+    except ValueError as e:
+        print(e)
+        # List all available sheets
+        xls = pd.ExcelFile(file_path)
+        print("Available sheet names:", xls.sheet_names)
+        timing['Read (s)'] = time.perf_counter() - start_time
+        return None, timing
+    read_done = time.perf_counter()
+
+    # Check the columns in the DataFrame
+    print("Columns in the DataFrame:", df.columns)
+
+    # Calculate the number of courses taught
+    df['# OF COURSES TAUGHT'] = df['SCH Load'] / df['Enrl Load']
+
+    # Cap the # OF COURSES TAUGHT to 3 for values greater than 3
+    df['# OF COURSES TAUGHT'] = df['# OF COURSES TAUGHT'].clip(upper=3)
+
+    # Ensure all columns are present in the DataFrame
+    for col in column_order:
+        if col not in df.columns:
+            print(f"Column '{col}' is missing from the DataFrame.")
+
+    # Reorder the DataFrame
+    df = df[column_order]
+
+    # Create a pivot table
+    pivot_table = df.pivot_table(
+        index=['ID'],  # Replace 'ID' with the actual column name for ID if different
+        values=['Class Nbr', '# OF COURSES TAUGHT'],
+        aggfunc={
+            'Class Nbr': 'count',  # Count of Class Nbr
+            '# OF COURSES TAUGHT': 'sum'  # Sum of capped hours taught
+        }
+    ).reset_index()
+
+    # Rename columns for clarity
+    pivot_table.rename(columns={'Class Nbr': 'Count of Class Nbr', '# OF COURSES TAUGHT': 'Sum of # OF COURSES TAUGHT'}, inplace=True)
+
+    # Reorder the pivot table columns
+    pivot_table = pivot_table[['ID', 'Count of Class Nbr', 'Sum of # OF COURSES TAUGHT']]
+
+    # Sheets handed to the next stage in memory when running inside the pipeline
+    sheets = {
+        'Updated Data': as_sheet(df),
+        'Pivot Table': as_sheet(pivot_table),
+    }
+    process_done = time.perf_counter()
+
+    if write_excel:
+        # Save the updated DataFrame and pivot table (streamed, the row-level sheet can be large) and copy it to OUTPUT
+        with open_streaming_workbook(output_file_path) as workbook:
+            stream_sheet(workbook, 'Updated Data', df)
+            stream_sheet(workbook, 'Pivot Table', pivot_table)
+        publish(output_file_path, [output_file_path_in_output])
+
+        print("New output files created successfully in both locations.")
+
+    timing.update({'Rows': len(df), 'IDs': len(pivot_table), 'Read (s)': read_done - start_time,
+                   'Process (s)': process_done - read_done, 'Write (s)': time.perf_counter() - process_done})
+    return sheets, timing
+
+
+# Function to process the files of one year one after another (in file order), so the last one's output is kept
+def process_files(year_jobs, write_excel):
+    return [process_file(*job, write_excel) for job in year_jobs]
 
-# Validate if the directory exists
-if not os.path.isdir(directory_path):
-    print(f"The directory '{directory_path}' does not exist. Please check the path and try again.")
-    exit()
 
 # Function to load and process ET_DELAWARE_STUDY_BASE* files
-def load_and_process_files(directory_path):
+def load_and_process_files(directory_path, store=None, workers=None, layout=None):
     file_pattern = os.path.join(directory_path, 'ET_DELAWARE_STUDY_BASE*.xlsx')
     excel_files = glob.glob(file_pattern)
 
@@ -36,9 +133,9 @@ def load_and_process_files(directory_path):
         print(f"No files found matching pattern 'ET_DELAWARE_STUDY_BASE*' in the directory: {directory_path}")
         return
 
+    # Work out the output files of every file first; the files themselves are processed below
+    jobs = []
     for file_path in excel_files:
-        print(f"Processing file: {file_path}")
-        
         # Extract the year or number from the file name using regex
         match = re.search(r'(\d{4})', os.path.basename(file_path))
         if match:
@@ -47,90 +144,70 @@ def load_and_process_files(directory_path):
         else:
             print(f"Could not extract year from file name: {os.path.basename(file_path)}")
             continue
-        
+
         # Save to the original directory
         output_file_path = os.path.join(directory_path, output_file_name)
         print(f"Output file will be: {output_file_path}")
-        
+
         # Create the OUTPUT folder directly inside the base directory if it doesn't exist
-        output_folder = os.path.join(directory_path, 'OUTPUT')
-        
+        output_folder = layout_folder(directory_path, 'output', layout)
+
         if not os.path.exists(output_folder):
             print(f"The OUTPUT folder '{output_folder}' does not exist. Creating it now.")
             os.makedirs(output_folder)
-        
+
         # Save to the OUTPUT folder
         output_file_path_in_output = os.path.join(output_folder, output_file_name)
         print(f"Also writing the file to the OUTPUT folder: {output_file_path_in_output}")
-        
-        # Sheet name
-        sheet_name = 'sheet1'  # Update this if needed
-
-        # Read the Excel sheet into a DataFrame
-        try:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-        except ValueError as e:
-            print(e)
-            # List all available sheets
-            xls = pd.ExcelFile(file_path)
-            print("Available sheet names:", xls.sheet_names)
-            continue
 
-        # Check the columns in the DataFrame
-        print("Columns in the DataFrame:", df.columns)
-
-        # Calculate the number of courses taught
-        if 'df' in locals():
-            df['# OF COURSES TAUGHT'] = df['SCH Load'] / df['Enrl Load']
-            
-            # Cap the # OF COURSES TAUGHT to 3 for values greater than 3
-            df['# OF COURSES TAUGHT'] = df['# OF COURSES TAUGHT'].clip(upper=3)
-
-            # Reorder the columns in the specified order
-            column_order = [
-                'ID', '# OF COURSES TAUGHT', 'Class Nbr', 'Course ID', 'Section', 
-                'Catalog', 'Subject', 'Career', 'Load Factor', 'Tot Enrl', 
-                'Tot Hrs C', 'Tot Ghrs', 'Title', 'Min Units', 'Max Units', 
-                'Instructor', 'Cls Load', 'Enrl Load', 'SCH Load', 
-                'AVG_SCH', 'USM SCH Fr', 'USM SCH So', 'USM SCH Jr', 
-                'USM SCH Sr', 'USM SCH Ms', 'USM SCH Sp', 'USM SCH Do', 
-                'DEPT_CIP_Code', 'DEPT_CHAIR_EMPLID', 'DEPT_HEAD', 'INSTR_DEPT'
-            ]
-
-            # Ensure all columns are present in the DataFrame
-            for col in column_order:
-                if col not in df.columns:
-                    print(f"Column '{col}' is missing from the DataFrame.")
-            
-            # Reorder the DataFrame
-            df = df[column_order]
-
-            # Create a pivot table
-            pivot_table = df.pivot_table(
-                index=['ID'],  # Replace 'ID' with the actual column name for ID if different
-                values=['Class Nbr', '# OF COURSES TAUGHT'],
-                aggfunc={
-                    'Class Nbr': 'count',  # Count of Class Nbr
-                    '# OF COURSES TAUGHT': 'sum'  # Sum of capped hours taught
-                }
-            ).reset_index()
-
-            # Rename columns for clarity
-            pivot_table.rename(columns={'Class Nbr': 'Count of Class Nbr', '# OF COURSES TAUGHT': 'Sum of # OF COURSES TAUGHT'}, inplace=True)
-
-            # Reorder the pivot table columns
-            pivot_table = pivot_table[['ID', 'Count of Class Nbr', 'Sum of # OF COURSES TAUGHT']]
-
-            # Save the updated DataFrame and pivot table to both locations
-            with pd.ExcelWriter(output_file_path) as writer:
-                df.to_excel(writer, sheet_name='Updated Data', index=False)
-                pivot_table.to_excel(writer, sheet_name='Pivot Table', index=False)
-
-            with pd.ExcelWriter(output_file_path_in_output) as writer:
-                df.to_excel(writer, sheet_name='Updated Data', index=False)
-                pivot_table.to_excel(writer, sheet_name='Pivot Table', index=False)
-
-            print("New output files created successfully in both locations.")
-
-# Load and process the files
-load_and_process_files(directory_path)
\ No newline at end of file
+        jobs.append((file_path, year, output_file_path, output_file_path_in_output))
+
+    if not jobs:
+        return
+
+    # Files with the same year write the same output files, so they are kept together and processed in file order
+    jobs_by_year = {}
+    for job in jobs:
+        jobs_by_year.setdefault(job[1], []).append(job)
+    for year, year_jobs in jobs_by_year.items():
+        if len(year_jobs) > 1:
+            print(f"{len(year_jobs)} files have the year {year}; they are processed one after another and the last one "
+                  f"is kept: {', '.join(os.path.basename(file_path) for file_path, _, _, _ in year_jobs)}")
+
+    # Every year is independent of the others, so several terms / years are processed at once
+    # (RUBRIC_LOADER_WORKERS=1 processes them one after another)
+    write_excel = should_write_excel(store)
+    workers = loader_workers(len(jobs_by_year), workers)
+    start_time = time.perf_counter()
+    year_results = map_script_function(os.path.abspath(__file__), 'process_files',
+                                       [(year_jobs, write_excel) for year_jobs in jobs_by_year.values()], workers)
+    jobs = [job for year_jobs in jobs_by_year.values() for job in year_jobs]
+    results = [result for results_of_year in year_results for result in results_of_year]
+
+    # Hand the results to the next stage in memory when running inside the pipeline (in file order within a year)
+    timings = []
+    for (_, year, _, _), (sheets, timing) in zip(jobs, results):
+        timings.append(timing)
+        if sheets is not None and store is not None:
+            store.put(f'DELAWARE_{year}', sheets)
+
+    # Per-file timing table
+    timing_table = pd.DataFrame(timings)
+    timing_table['Total (s)'] = timing_table[['Read (s)', 'Process (s)', 'Write (s)']].sum(axis=1)
+    print(f"\nDelaware files processed with {workers} worker(s) in {time.perf_counter() - start_time:.2f} s:")
+    print(timing_table.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+
+
+def run(directory_path, store=None, layout=None):
+    # Validate if the directory exists
+    if not os.path.isdir(directory_path):
+        raise NotADirectoryError(f"The directory '{directory_path}' does not exist. Please check the path and try again.")
+
+    # Load and process the files
+    load_and_process_files(directory_path, store, layout=layout)
+
+
+if __name__ == "__main__":
+    # Prompt user for the base directory
+    directory_path = input("Enter the base directory path: ")
+    run(directory_path)
@@ -1,39 +1,30 @@
 import pandas as pd
 import os
-import glob
 import numpy as np
 
+from rubric_excel import open_streaming_workbook, publish, read_extracts, stream_sheet
+from rubric_layout import layout_folder
+from rubric_scoring import total_or_value
+from rubric_store import as_sheet, should_write_excel
+
 # Function to load and combine ET_RAF_COURSE_SCH_* files
 def load_et_raf_files(directory_path):
     file_pattern = os.path.join(directory_path, 'ET_RAF_COURSE_SCH_*.xlsx')
-    excel_files = glob.glob(file_pattern)
+    required_columns = ['ID', 'SCH Load', 'WithinDisc(1)/InterDisc(1.5)',
+                        'Instr HEGIS Code', 'Instr HEGIS Descr',
+                        'Instr School', 'Instr College',
+                        'Instr HEGIS AS OF Term', 'Class HEGIS Code',
+                        'Campus', 'Class Nbr']
+
+    # Read all the files at once (only the required columns are parsed); each row keeps the name of its file
+    combined_data = read_extracts(file_pattern, columns=required_columns, sheet_name=0, header=1)
 
-    if not excel_files:
+    if combined_data is None:
         print(f"No files found matching pattern 'ET_RAF_COURSE_SCH_*' in the directory: {directory_path}")
         return None
 
-    combined_data = pd.DataFrame()
-    
-    for file in excel_files:
-        try:
-            df = pd.read_excel(file, sheet_name=0, header=1)
-            required_columns = ['ID', 'SCH Load', 'WithinDisc(1)/InterDisc(1.5)', 
-                                'Instr HEGIS Code', 'Instr HEGIS Descr', 
-                                'Instr School', 'Instr College', 
-                                'Instr HEGIS AS OF Term', 'Class HEGIS Code', 
-                                'Campus', 'Class Nbr']
-            df = df[required_columns]
-            df.dropna(inplace=True)
-            combined_data = pd.concat([combined_data, df], ignore_index=True)
-            print(f"Successfully processed file: {file}")
-        except Exception as e:
-            print(f"Error processing file {file}: {e}")
-    
-    return combined_data
-
-# Load and combine ET_RAF_COURSE_SCH_* data
-directory_path = input("Enter the base directory path: ")
-combined_data = load_et_raf_files(directory_path)
+    return combined_data.dropna(subset=required_columns).reset_index(drop=True)
+
 # C:\...\...\The University of Southern Mississippi\...\W Drive\Userfiles\AKale\Resource Allocation Rubric\AY_*_*\INSTRUCTIONAL EFFORT PART 1
 # The script loads and combines data from all files matching the pattern ET_RAF_COURSE_SCH_*.xlsx in a specified directory.
 # It extracts the relevant columns, drops any rows with missing data, and concatenates the data into a single DataFrame.
@@ -52,8 +43,35 @@ combined_data = load_et_raf_files(directory_path)
 # The script writes the final pivot table (with grand totals) to the Excel file.
 # It formats the header and totals in the Excel sheet.
 # A summary pivot table is created to show aggregated metrics like Combined Score, SCH/FTE, and Score for each campus, and written to a separate sheet.
+# When run through rubric_pipeline.py the INSTRUCTIONAL_FTE pivot is taken from memory (store) and the Summary Table is handed on in memory.
+
+# Function to load the Grand Total column of the INSTRUCTIONAL_FTE pivot
+def load_grand_total_data(directory_path, store=None):
+    fte_artifact = store.find('INSTRUCTIONAL_FTE_') if store is not None else None
+    if fte_artifact:
+        grand_total_data = store.get(fte_artifact, 'Pivot Table NEW CALC FTE')
+    else:
+        ft_file_path = os.path.join(directory_path, 'INSTRUCTIONAL_FTE_4241.xlsx')
+        grand_total_data = pd.read_excel(ft_file_path, sheet_name='Pivot Table NEW CALC FTE')
+
+    # Adjust based on actual column names
+    return grand_total_data[['HEGIS Code', 'Grand Total']]  # Using the column from grand total
+
+
+# Function to calculate SCH/FTE for every row of the merged table, including total rows (the total rows are the ones
+# with a blank Campus and have their SCH Score in TOTAL). There is no guard: a Grand Total of 0 gives inf
+def sch_per_fte(merged_table):
+    return total_or_value(merged_table, 'Campus', '', 'TOTAL', 'SCH Score') / merged_table['Grand Total']
+
+
+def run(directory_path, store=None, layout=None):
+    # Load and combine ET_RAF_COURSE_SCH_* data
+    combined_data = load_et_raf_files(directory_path)
+
+    if combined_data is None:
+        print("All operations completed.")
+        return
 
-if combined_data is not None:
     print("ET_RAF_COURSE_SCH_* data loaded and combined.")
 
     # Create the SCH Score column
@@ -62,19 +80,117 @@ if combined_data is not None:
     # Reorder columns to place 'SCH Score' after 'WithinDisc(1)/InterDisc(1.5)'
     ordered_columns = [
         'ID', 'SCH Load', 'WithinDisc(1)/InterDisc(1.5)', 'SCH Score',
-        'Instr HEGIS Code', 'Instr HEGIS Descr', 
-        'Instr School', 'Instr College', 
-        'Instr HEGIS AS OF Term', 'Class HEGIS Code', 
+        'Instr HEGIS Code', 'Instr HEGIS Descr',
+        'Instr School', 'Instr College',
+        'Instr HEGIS AS OF Term', 'Class HEGIS Code',
         'Campus', 'Class Nbr'
     ]
     combined_data = combined_data[ordered_columns]
 
+    # Create a pivot table for the combined data
+    pivot_table = combined_data.pivot_table(
+        index=['Instr School', 'Instr HEGIS Code', 'Campus'],
+        values='SCH Score',
+        aggfunc='sum'
+    ).reset_index()
+
+    # Group by 'Instr HEGIS Code' and calculate totals
+    total_rows = pivot_table.groupby(['Instr School', 'Instr HEGIS Code'], as_index=False).agg({'SCH Score': 'sum'})
+    total_rows['Campus'] = ''  # Leave campus blank for the total rows
+    total_rows = total_rows.rename(columns={'SCH Score': 'TOTAL'})
+
+    # Append the total rows to the pivot table
+    final_table = pd.concat([pivot_table, total_rows], ignore_index=True).sort_values(by=['Instr School', 'Instr HEGIS Code', 'Campus'])
+
+    # Attempt to load the Grand Total from INSTRUCTIONAL_FTE_4241.xlsx
+    try:
+        grand_total_data = load_grand_total_data(directory_path, store)
+
+        # Merging using the correct column names and retaining the original order
+        if 'Instr HEGIS Code' in final_table.columns and 'HEGIS Code' in grand_total_data.columns:
+            # Perform the merge
+            merged_table = final_table.merge(grand_total_data, left_on='Instr HEGIS Code', right_on='HEGIS Code', how='left')
+
+            # Define the final column order: retain existing order and add 'Grand Total' at the end
+            final_column_order = list(final_table.columns) + ['Grand Total']
+            merged_table = merged_table[final_column_order]
+
+            # Calculate SCH/FTE for every row, including total rows
+            merged_table['SCH/FTE'] = sch_per_fte(merged_table)
+
+            # Combine SCH Score and TOTAL into one column
+            # Move Combined Score next to Campus
+            merged_table['Combined Score'] = total_or_value(merged_table, 'Campus', '', 'TOTAL', 'SCH Score')
+
+            # Calculate Score as SCH/FTE * 0.10 for every row, including total rows
+            merged_table['Score'] = merged_table['SCH/FTE'] * 0.10
+        else:
+            print("One of the DataFrames does not contain the required HEGIS code column.")
+
+    except Exception as e:
+        print(f"Error processing INSTRUCTIONAL_FTE_4241.xlsx for grand total: {e}")
+
+    # Replace NaN values with 0 in 'SCH/FTE', 'Score', and 'Combined Score' columns
+    merged_table['SCH/FTE'] = merged_table['SCH/FTE'].fillna(0)
+    merged_table['Score'] = merged_table['Score'].fillna(0)
+    merged_table['Combined Score'] = merged_table['Combined Score'].fillna(0)
+
+    # Format the SCH/FTE column to two decimal places
+    merged_table['SCH/FTE'] = merged_table['SCH/FTE'].round(2)
+
+    # Define the Final Column order excluding the 'TOTAL' column for output
+    final_column_order = [
+        'Instr School', 'Instr HEGIS Code', 'Campus', 'Combined Score', 'Grand Total',
+        'SCH/FTE', 'Score'
+    ]
+    merged_table = merged_table[final_column_order]
+
+    # Create a summary pivot table to hold the required metrics
+    summary_pivot_table = merged_table.pivot_table(
+        index='Instr HEGIS Code',
+        columns='Campus',
+        values=['Combined Score', 'Grand Total', 'SCH/FTE', 'Score'],  # Ensure all columns are valid
+        aggfunc='sum',
+        fill_value=0.00
+    )
+
+    # Reset index for better readability
+    summary_pivot_table.reset_index(inplace=True)
+
+    summary_pivot_table.columns = [
+    'HEGIS Code',
+    'Total Combined Score',
+    'HBG Combined Score',
+    'USMGC Combined Score',
+    'Grand Total',
+    'Grand Total 2',
+    'Grand Total 3',
+    'SCH/FTE Total',
+    'SCH/FTE HBG',
+    'SCH/FTE USMGC',
+    'Total Score',
+    'HBG Score',
+    'USMGC Score'
+    ]
+
+    # Hand the sheets to FINAL OUTPUT in memory when running inside the pipeline
+    if store is not None:
+        store.put('INSTRUCTIONAL_EFFORT_PART_1', {
+            'Combined Data': as_sheet(combined_data),
+            'Pivot Table with Grand Total': as_sheet(merged_table),
+            'Summary Table': as_sheet(summary_pivot_table),
+        })
+
+    if not should_write_excel(store):
+        print("All operations completed.")
+        return
+
     # Define the output file name
     output_file_name = 'INSTRUCTIONAL_EFFORT_PART_1.xlsx'
-    
+
     # Define the path for the output folder in the parent directory
     parent_directory = os.path.dirname(directory_path)
-    output_folder = os.path.join(parent_directory, 'OUTPUT')
+    output_folder = layout_folder(parent_directory, 'output', layout)
 
     # Ensure the OUTPUT folder exists; if not, create it
     if not os.path.exists(output_folder):
@@ -90,130 +206,34 @@ if combined_data is not None:
     # Save the Excel file to both locations
     output_file_path_base = os.path.join(directory_path, output_file_name)
 
-    for output_file_path in [output_file_path_base, output_file_path_output_folder]:
-        with pd.ExcelWriter(output_file_path, engine='xlsxwriter') as writer:
-            # Write the combined data to a new sheet
-            combined_data.to_excel(writer, sheet_name='Combined Data', index=False)
-
-            # Create a pivot table for the combined data
-            pivot_table = combined_data.pivot_table(
-                index=['Instr School', 'Instr HEGIS Code', 'Campus'],
-                values='SCH Score',
-                aggfunc='sum'
-            ).reset_index()
-
-            # Group by 'Instr HEGIS Code' and calculate totals
-            total_rows = pivot_table.groupby(['Instr School', 'Instr HEGIS Code'], as_index=False).agg({'SCH Score': 'sum'})
-            total_rows['Campus'] = ''  # Leave campus blank for the total rows
-            total_rows = total_rows.rename(columns={'SCH Score': 'TOTAL'})
-
-            # Append the total rows to the pivot table
-            final_table = pd.concat([pivot_table, total_rows], ignore_index=True).sort_values(by=['Instr School', 'Instr HEGIS Code', 'Campus'])
-
-            # Attempt to load the Grand Total from INSTRUCTIONAL_FTE_4241.xlsx
-            try:
-                ft_file_path = os.path.join(directory_path, 'INSTRUCTIONAL_FTE_4241.xlsx')
-                grand_total_data = pd.read_excel(ft_file_path, sheet_name='Pivot Table NEW CALC FTE')
-
-                # Adjust based on actual column names
-                grand_total_data = grand_total_data[['HEGIS Code', 'Grand Total']]  # Using the column from grand total
-
-                # Merging using the correct column names and retaining the original order
-                if 'Instr HEGIS Code' in final_table.columns and 'HEGIS Code' in grand_total_data.columns:
-                    # Perform the merge
-                    merged_table = final_table.merge(grand_total_data, left_on='Instr HEGIS Code', right_on='HEGIS Code', how='left')
-
-                    # Define the final column order: retain existing order and add 'Grand Total' at the end
-                    final_column_order = list(final_table.columns) + ['Grand Total']
-                    merged_table = merged_table[final_column_order]
-
-                    # Calculate SCH/FTE for every row, including total rows
-                    merged_table['SCH/FTE'] = merged_table.apply(lambda row: row['TOTAL'] / row['Grand Total'] if row['Campus'] == '' else row['SCH Score'] / row['Grand Total'], axis=1)
-
-                    # Combine SCH Score and TOTAL into one column
-                    # Move Combined Score next to Campus
-                    merged_table['Combined Score'] = merged_table.apply(
-                        lambda row: row['TOTAL'] if row['Campus'] == '' else row['SCH Score'], axis=1
-                    )
-
-                    # Calculate Score as SCH/FTE * 0.10 for every row, including total rows
-                    merged_table['Score'] = merged_table['SCH/FTE'] * 0.10
-                else:
-                    print("One of the DataFrames does not contain the required HEGIS code column.")
-
-            except Exception as e:
-                print(f"Error processing INSTRUCTIONAL_FTE_4241.xlsx for grand total: {e}")
-
-            # Replace NaN values with 0 in 'SCH/FTE', 'Score', and 'Combined Score' columns
-            merged_table['SCH/FTE'] = merged_table['SCH/FTE'].fillna(0)
-            merged_table['Score'] = merged_table['Score'].fillna(0)
-            merged_table['Combined Score'] = merged_table['Combined Score'].fillna(0)
-
-            # Format the SCH/FTE column to two decimal places
-            merged_table['SCH/FTE'] = merged_table['SCH/FTE'].round(2)
-
-            # Define the Final Column order excluding the 'TOTAL' column for output
-            final_column_order = [
-                'Instr School', 'Instr HEGIS Code', 'Campus', 'Combined Score', 'Grand Total',
-                'SCH/FTE', 'Score'
-            ]
-            merged_table = merged_table[final_column_order]
+    # Streamed row by row, so the row-level Combined Data sheet does not have to fit in memory as a workbook
+    with open_streaming_workbook(output_file_path_base) as workbook:
+        # Write the combined data to a new sheet
+        stream_sheet(workbook, 'Combined Data', combined_data)
+
+        # Format the totals in bold for the pivot table
+        total_format = workbook.add_format({'bold': True})
+        score_formats = [total_format if campus == '' else None for campus in merged_table['Campus']]  # Identify total rows
+
+        # Set number format for SCH/FTE to two decimal places
+        number_format = workbook.add_format({'num_format': '0.00'})
+        column_formats = {'D:D': (12, number_format)}  # Adjust 'D:D' based on your actual column index for SCH/FTE
+
+        # Write the final table to a new sheet (bold and bordered header, bold Score on the total rows)
+        stream_sheet(workbook, 'Pivot Table with Grand Total', merged_table, header_format={'bold': True, 'border': 1},
+                     column_formats=column_formats, cell_formats={'Score': score_formats})
+
+        # Write the summary pivot table to a new sheet
+        stream_sheet(workbook, 'Summary Table', summary_pivot_table)
+
+    print(f"Data successfully saved to {output_file_path_base}.")
+
+    # The OUTPUT folder gets the same file
+    publish(output_file_path_base, [output_file_path_output_folder])
+
+    print("All operations completed.")
+
 
-            # Write the final table to a new sheet
-            merged_table.to_excel(writer, sheet_name='Pivot Table with Grand Total', index=False)
-
-            # Access the workbook and the worksheet for formatting
-            workbook = writer.book
-            pivot_worksheet = writer.sheets['Pivot Table with Grand Total']
-
-            # Set the header format for the pivot table
-            header_format = workbook.add_format({'bold': True, 'border': 1})
-            for col_num, value in enumerate(merged_table.columns.values):
-                pivot_worksheet.write(0, col_num, value, header_format)
-
-            # Format the totals in bold for the pivot table
-            total_format = workbook.add_format({'bold': True})
-
-            for row_num in range(1, len(merged_table) + 1):
-                if merged_table.iloc[row_num - 1]['Campus'] == '':  # Identify total rows
-                    # Also write the calculated Score for total rows
-                    pivot_worksheet.write(row_num, merged_table.columns.get_loc('Score'), merged_table.iloc[row_num - 1]['Score'], total_format)
-
-            # Set number format for SCH/FTE to two decimal places
-            number_format = workbook.add_format({'num_format': '0.00'})
-            pivot_worksheet.set_column('D:D', 12, number_format)  # Adjust 'D:D' based on your actual column index for SCH/FTE
-
-            # Create a summary pivot table to hold the required metrics
-            summary_pivot_table = merged_table.pivot_table(
-                index='Instr HEGIS Code',
-                columns='Campus',
-                values=['Combined Score', 'Grand Total', 'SCH/FTE', 'Score'],  # Ensure all columns are valid
-                aggfunc='sum',
-                fill_value=0.00
-            )
-
-            # Reset index for better readability
-            summary_pivot_table.reset_index(inplace=True)
-
-            summary_pivot_table.columns = [
-            'HEGIS Code', 
-            'Total Combined Score', 
-            'HBG Combined Score', 
-            'USMGC Combined Score', 
-            'Grand Total',
-            'Grand Total 2', 
-            'Grand Total 3', 
-            'SCH/FTE Total', 
-            'SCH/FTE HBG',
-            'SCH/FTE USMGC', 
-            'Total Score', 
-            'HBG Score', 
-            'USMGC Score'
-            ]
-
-            # Write the summary pivot table to a new sheet
-            summary_pivot_table.to_excel(writer, sheet_name='Summary Table', index=False)
-            
-            print(f"Data successfully saved to {output_file_path}.")
-
-print("All operations completed.")
\ No newline at end of file
+if __name__ == "__main__":
+    directory_path = input("Enter the base directory path: ")
+    run(directory_path)
@@ -2,8 +2,12 @@ import pandas as pd
 import glob
 import os
 
-# Prompt user for the base directory
-directory_path = input("Enter the base directory path: ")
+from rubric_campus import ONLINE_CAMPUS_NAMES, campus_codes
+from rubric_excel import open_streaming_workbook, publish, read_extracts, stream_sheet
+from rubric_layout import layout_folder
+from rubric_store import as_sheet, should_write_excel
+from rubric_totals import append_totals
+
 # C:\...\...\The University of Southern Mississippi\...\W Drive\Userfiles\AKale\Resource Allocation Rubric\AY_**_**\SUCCESS
 # It loads data from two sources:
 # JR Graduation Rate CSV file (JR Graduation Rate_Full Data_data.csv).
@@ -29,184 +33,192 @@ directory_path = input("Enter the base directory path: ")
 # ET RAF Completions: Merged ET RAF data.
 # pivot JR rate: Pivot table with graduation rates and scores.
 # Summary: Summary pivot table with aggregated metrics.
+# When run through rubric_pipeline.py the Summary is handed on to FINAL OUTPUT in memory (store).
 
-# Validate if the directory exists
-if not os.path.isdir(directory_path):
-    print("Directory does not exist. Exiting...")
-    exit()
-
-# Get the parent directory from the base path
-parent_directory = os.path.dirname(directory_path)
-
-# Check for the OUTPUT folder in the parent directory
-output_folder = os.path.join(parent_directory, 'OUTPUT')
-if not os.path.exists(output_folder):
-    print(f"The OUTPUT folder '{output_folder}' does not exist. Please check the parent directory.")
-    exit()
-else:
-    print(f"OUTPUT folder found at: {output_folder}")
-
-# File name for the output Excel in the OUTPUT folder
-output_file_name = 'SUCCESS_PART_2.xlsx'
-output_file_path = os.path.join(output_folder, output_file_name)
-
-# Also set the path for saving in the base directory
-base_output_file_path = os.path.join(directory_path, output_file_name)
-
-# Load the JR Graduation Rate Data
-jr_grad_file = os.path.join(directory_path, 'JR Graduation Rate_Full Data_data.csv')
-
-# Check if the JR Graduation Rate file exists
-if not os.path.isfile(jr_grad_file):
-    print("JR Graduation Rate file does not exist. Exiting...")
-    exit()
-
-# Load the JR Graduation Rate file
-jr_data = pd.read_csv(jr_grad_file)
-
-# Load ET_RAF_COMPLETIONS Data using a wildcard
-et_files = glob.glob(os.path.join(directory_path, "ET_RAF_COMPLETIONS_*.xlsx"))
-et_data_list = []
-
-# Check if ET_RAF_COMPLETIONS files exist
-if not et_files:
-    print("No ET_RAF_COMPLETIONS files found. Exiting...")
-    exit()
-
-# Load each ET_RAF_COMPLETIONS file, skipping the first row
-for file in et_files:
-    et_data = pd.read_excel(file, skiprows=1)  # Skip the first row
-    et_data_list.append(et_data[['HEGIS Code', 'Discipline Desc']])
+# Insert 'Total' row under each HEGIS Code
+def insert_sums(df, sums):
+    hegis_codes = df.index.get_level_values('HEGIS Code').unique()
+    if len(hegis_codes) == 0:
+        return pd.DataFrame()
 
-# Concatenate all loaded ET data and drop duplicates
-merged_et_data = pd.concat(et_data_list, ignore_index=True).drop_duplicates()
+    # Build all the SUM rows at once (with the dtype a single row of sums has) and concatenate once, instead of
+    # concatenating onto the result for every HEGIS Code
+    sum_rows = sums.loc[hegis_codes]
+    sum_rows = sum_rows.astype(sum_rows.iloc[0].dtype)
+    sum_rows.index = pd.MultiIndex.from_arrays([hegis_codes, ['SUM'] * len(hegis_codes)], names=['HEGIS Code', 'Campus'])
 
-# Rename columns for clarity
-jr_data.rename(columns={'Primary Discipline': 'Discipline Desc'}, inplace=True)
+    # Put each SUM row right after the rows of its HEGIS Code (codes in order of appearance, rows in their original order)
+    return append_totals(df, sum_rows, 'HEGIS Code')
 
-# Replace 'Online' with 'Hattiesburg' in the 'Campus' column of JR Graduation Rate data
-jr_data['Campus'] = jr_data['Campus'].replace('Online', 'Hattiesburg')
+def run(directory_path, store=None, layout=None):
+    # Validate if the directory exists
+    if not os.path.isdir(directory_path):
+        raise NotADirectoryError("Directory does not exist. Exiting...")
 
-# Merge the dataframes on Discipline Desc
-merged_data = pd.merge(jr_data, merged_et_data, on='Discipline Desc', how='left')
+    # Get the parent directory from the base path
+    parent_directory = os.path.dirname(directory_path)
 
-# Strip whitespace from column names for clean matching
-merged_data.columns = merged_data.columns.str.strip()
+    # Check for the OUTPUT folder in the parent directory
+    output_folder = layout_folder(parent_directory, 'output', layout)
+    if should_write_excel(store):
+        if not os.path.exists(output_folder):
+            raise FileNotFoundError(f"The OUTPUT folder '{output_folder}' does not exist. Please check the parent directory.")
+        else:
+            print(f"OUTPUT folder found at: {output_folder}")
 
-# Check for the specific column with spaces included
-expected_column = 'JR Retention  Year shift - Split 1'  # Note the extra spaces
-if expected_column not in merged_data.columns:
-    print(f"Column matching '{expected_column}' not found in merged_data. Exiting...")
-    exit()
+    # File name for the output Excel in the OUTPUT folder
+    output_file_name = 'SUCCESS_PART_2.xlsx'
+    output_file_path = os.path.join(output_folder, output_file_name)
 
-# Create COMPLETED DEGREE (Y/N) column based on Degree Completion Term
-merged_data['COMPLETED DEGREE (Y/N)'] = merged_data['Degree Completion Term'].notnull().replace({True: 'Y', False: 'N'})
+    # Also set the path for saving in the base directory
+    base_output_file_path = os.path.join(directory_path, output_file_name)
 
-# Filter the data based on the identified retention column containing '4'
-filtered_data = merged_data[merged_data[expected_column].astype(str).str.contains('4', case=False, na=False)]
+    # Load the JR Graduation Rate Data
+    jr_grad_file = os.path.join(directory_path, 'JR Graduation Rate_Full Data_data.csv')
 
-# Create the pivot table from the filtered data
-pivot_table = filtered_data.pivot_table(
-    index=['HEGIS Code', 'Campus'],  # Rows (removed 'Primary School')
-    columns='COMPLETED DEGREE (Y/N)',  # Columns for Completed Degree
-    values='Student ID',  # Values to count
-    aggfunc='count',  # Count of Student ID
-    fill_value=0  # Fill missing values with 0
-)
+    # Check if the JR Graduation Rate file exists
+    if not os.path.isfile(jr_grad_file):
+        raise FileNotFoundError("JR Graduation Rate file does not exist. Exiting...")
 
-# Focus only on 'Y' and create a total column for completed degrees
-pivot_table['Total'] = pivot_table.get('Y', 0) + pivot_table.get('N', 0)  # Total counts Y and N
+    # Load the JR Graduation Rate file
+    jr_data = pd.read_csv(jr_grad_file)
 
-# Create the JR GRAD RATE column by calculating the ratio of Y to Total
-pivot_table['JR GRAD RATE'] = pivot_table['Y'] / pivot_table['Total']
+    # Load ET_RAF_COMPLETIONS Data using a wildcard
+    et_pattern = os.path.join(directory_path, "ET_RAF_COMPLETIONS_*.xlsx")
 
-# Add a new column 'Score' based on the 'JR GRAD RATE' column
-pivot_table['Score'] = pivot_table['JR GRAD RATE'] * 0.175
+    # Check if ET_RAF_COMPLETIONS files exist
+    if not glob.glob(et_pattern):
+        raise FileNotFoundError("No ET_RAF_COMPLETIONS files found. Exiting...")
 
-# Drop the 'N' column if it exists
-pivot_table.drop(columns=['N'], inplace=True, errors='ignore')
+    # Load all ET_RAF_COMPLETIONS files in parallel, skipping the first row
+    et_data = read_extracts(et_pattern, columns=['HEGIS Code', 'Discipline Desc'], skiprows=1)  # Skip the first row
+    if et_data is None:
+        raise ValueError("None of the ET_RAF_COMPLETIONS files could be read. Exiting...")
+
+    # Drop duplicates across all files (the Source File column is left out so the same pair from two terms counts once)
+    merged_et_data = et_data[['HEGIS Code', 'Discipline Desc']].drop_duplicates()
+
+    # Rename columns for clarity
+    jr_data.rename(columns={'Primary Discipline': 'Discipline Desc'}, inplace=True)
+
+    # Replace 'Online' with 'Hattiesburg' in the 'Campus' column of JR Graduation Rate data (as a category column)
+    jr_data['Campus'] = campus_codes(jr_data['Campus'], ONLINE_CAMPUS_NAMES, normalize=False)
 
-# Add a sum row for each HEGIS Code by grouping by 'HEGIS Code' and summing
-hegis_sums = pivot_table.groupby('HEGIS Code').sum()
+    # Merge the dataframes on Discipline Desc
+    merged_data = pd.merge(jr_data, merged_et_data, on='Discipline Desc', how='left')
+
+    # Strip whitespace from column names for clean matching
+    merged_data.columns = merged_data.columns.str.strip()
+
+    # Check for the specific column with spaces included
+    expected_column = 'JR Retention  Year shift - Split 1'  # Note the extra spaces
+    if expected_column not in merged_data.columns:
+        raise ValueError(f"Column matching '{expected_column}' not found in merged_data. Exiting...")
+
+    # Create COMPLETED DEGREE (Y/N) column based on Degree Completion Term
+    merged_data['COMPLETED DEGREE (Y/N)'] = merged_data['Degree Completion Term'].notnull().replace({True: 'Y', False: 'N'})
+
+    # Filter the data based on the identified retention column containing '4'
+    filtered_data = merged_data[merged_data[expected_column].astype(str).str.contains('4', case=False, na=False)]
+
+    # Create the pivot table from the filtered data
+    pivot_table = filtered_data.pivot_table(
+        index=['HEGIS Code', 'Campus'],  # Rows (removed 'Primary School')
+        observed=True,  # Only the campuses that occur
+        columns='COMPLETED DEGREE (Y/N)',  # Columns for Completed Degree
+        values='Student ID',  # Values to count
+        aggfunc='count',  # Count of Student ID
+        fill_value=0  # Fill missing values with 0
+    )
+
+    # Focus only on 'Y' and create a total column for completed degrees
+    pivot_table['Total'] = pivot_table.get('Y', 0) + pivot_table.get('N', 0)  # Total counts Y and N
+
+    # Create the JR GRAD RATE column by calculating the ratio of Y to Total
+    pivot_table['JR GRAD RATE'] = pivot_table['Y'] / pivot_table['Total']
+
+    # Add a new column 'Score' based on the 'JR GRAD RATE' column
+    pivot_table['Score'] = pivot_table['JR GRAD RATE'] * 0.175
+
+    # Drop the 'N' column if it exists
+    pivot_table.drop(columns=['N'], inplace=True, errors='ignore')
+
+    # Add a sum row for each HEGIS Code by grouping by 'HEGIS Code' and summing
+    hegis_sums = pivot_table.groupby('HEGIS Code').sum()
+
+    # Call the function to insert sum rows under each HEGIS Code
+    pivot_table_with_sums = insert_sums(pivot_table, hegis_sums)
+
+    # Reset the index to convert MultiIndex to columns for saving
+    pivot_table_with_sums.reset_index(inplace=True)
+
+    # Create final_output based on pivot_table_with_sums
+    final_output = pivot_table_with_sums.copy()  # Copy the pivot table for further processing
+
+    # Check if required columns exist
+    required_columns = ['HEGIS Code', 'Campus', 'Y', 'Total', 'JR GRAD RATE', 'Score']
+    missing_columns = [col for col in required_columns if col not in final_output.columns]
+
+    if missing_columns:
+        print(f"Missing columns in final_output: {missing_columns}")
+
+        # Handle missing columns by defining them with default values
+        for col in missing_columns:
+            final_output[col] = 0  # Or any logic to fill missing columns
 
-# Insert 'Total' row under each HEGIS Code
-def insert_sums(df, sums):
-    result = pd.DataFrame()
-    for hegis_code in df.index.get_level_values('HEGIS Code').unique():
-        temp_df = df.xs(hegis_code, level='HEGIS Code', drop_level=False)
-        result = pd.concat([result, temp_df])
-        sum_row = pd.DataFrame(sums.loc[hegis_code]).T
-        sum_row.index = pd.MultiIndex.from_tuples([(hegis_code, 'SUM')], names=['HEGIS Code', 'Campus'])
-        result = pd.concat([result, sum_row])
-    return result
-
-# Call the function to insert sum rows under each HEGIS Code
-pivot_table_with_sums = insert_sums(pivot_table, hegis_sums)
-
-# Reset the index to convert MultiIndex to columns for saving
-pivot_table_with_sums.reset_index(inplace=True)
-
-# Create final_output based on pivot_table_with_sums
-final_output = pivot_table_with_sums.copy()  # Copy the pivot table for further processing
-
-# Check if required columns exist
-required_columns = ['HEGIS Code', 'Campus', 'Y', 'Total', 'JR GRAD RATE', 'Score']
-missing_columns = [col for col in required_columns if col not in final_output.columns]
-
-if missing_columns:
-    print(f"Missing columns in final_output: {missing_columns}")
-    
-    # Handle missing columns by defining them with default values
-    for col in missing_columns:
-        final_output[col] = 0  # Or any logic to fill missing columns
-
-# Create a summary pivot table to hold the required metrics
-summary_pivot_table = final_output.pivot_table(
-    index='HEGIS Code',
-    columns='Campus',
-    values=['Y', 'Total', 'JR GRAD RATE', 'Score'],  # Ensure all columns are valid
-    aggfunc='sum',
-    fill_value=0.00
-)
-
-# Reset index for better readability
-summary_pivot_table.reset_index(inplace=True)
-
-# Optional: Rename columns for better clarity
-summary_pivot_table.columns = ['HEGIS Code', 'Hattiesburg Count JR', ' Total JR', 
-                                'USM Gulf Coast JR', 'Hattiesburg Score', 'Total Scores', 
-                                'USM Gulf Coast Score', 'Total Hattiesburg', 'Sum Total', 
-                                'USM Gulf Coast Total', 'Hattiesburg Y', 'Sum Y', 'USM Gulf Coast']
-
-# Display the resulting summary pivot table
-print("Summary Pivot Table:")
-print(summary_pivot_table)
-
-# Function to write DataFrames to Excel
-def write_to_excel(writer, sheet_name, df):
-    if sheet_name in writer.sheets:
-        df.to_excel(writer, sheet_name=sheet_name, index=False, if_sheet_exists='replace')
-    else:
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-# Save the Excel files to the OUTPUT folder and base directory
-print(f"Saving to: {output_file_path}")
-print(f"Also saving to: {base_output_file_path}")
-
-# Write DataFrames to the same Excel file in the OUTPUT folder
-with pd.ExcelWriter(output_file_path, engine='openpyxl', mode='w') as writer:
-    write_to_excel(writer, 'JR Graduation Rate', merged_data)
-    write_to_excel(writer, 'ET RAF Completions', merged_et_data)
-    write_to_excel(writer, 'pivot JR rate', pivot_table_with_sums)
-    write_to_excel(writer, 'Summary', summary_pivot_table)
-
-# Write DataFrames to the same Excel file in the base directory
-with pd.ExcelWriter(base_output_file_path, engine='openpyxl', mode='w') as writer:
-    write_to_excel(writer, 'JR Graduation Rate', merged_data)
-    write_to_excel(writer, 'ET RAF Completions', merged_et_data)
-    write_to_excel(writer, 'pivot JR rate', pivot_table_with_sums)
-    write_to_excel(writer, 'Summary', summary_pivot_table)
-
-# Print confirmation message for the output path
-print(f"Output successfully written to: {output_file_path}")
-print(f"Output also successfully written to: {base_output_file_path}")
\ No newline at end of file
+    # Create a summary pivot table to hold the required metrics
+    summary_pivot_table = final_output.pivot_table(
+        index='HEGIS Code',
+        columns='Campus',
+        values=['Y', 'Total', 'JR GRAD RATE', 'Score'],  # Ensure all columns are valid
+        aggfunc='sum',
+        fill_value=0.00
+    )
+
+    # Reset index for better readability
+    summary_pivot_table.reset_index(inplace=True)
+
+    # Optional: Rename columns for better clarity
+    summary_pivot_table.columns = ['HEGIS Code', 'Hattiesburg Count JR', ' Total JR',
+                                    'USM Gulf Coast JR', 'Hattiesburg Score', 'Total Scores',
+                                    'USM Gulf Coast Score', 'Total Hattiesburg', 'Sum Total',
+                                    'USM Gulf Coast Total', 'Hattiesburg Y', 'Sum Y', 'USM Gulf Coast']
+
+    # Display the resulting summary pivot table
+    print("Summary Pivot Table:")
+    print(summary_pivot_table)
+
+    # Hand the sheets to FINAL OUTPUT in memory when running inside the pipeline
+    if store is not None:
+        store.put('SUCCESS_PART_2', {
+            'JR Graduation Rate': as_sheet(merged_data),
+            'ET RAF Completions': as_sheet(merged_et_data),
+            'pivot JR rate': as_sheet(pivot_table_with_sums),
+            'Summary': as_sheet(summary_pivot_table),
+        })
+
+    if not should_write_excel(store):
+        return
+
+    # Save the Excel files to the OUTPUT folder and base directory
+    print(f"Saving to: {output_file_path}")
+    print(f"Also saving to: {base_output_file_path}")
+
+    # Write DataFrames to the Excel file in the OUTPUT folder and copy it to the base directory
+    # (streamed row by row, so the row-level JR Graduation Rate sheet does not have to fit in memory as a workbook)
+    with open_streaming_workbook(output_file_path) as workbook:
+        stream_sheet(workbook, 'JR Graduation Rate', merged_data)
+        stream_sheet(workbook, 'ET RAF Completions', merged_et_data)
+        stream_sheet(workbook, 'pivot JR rate', pivot_table_with_sums)
+        stream_sheet(workbook, 'Summary', summary_pivot_table)
+    publish(output_file_path, [base_output_file_path])
+
+    # Print confirmation message for the output path
+    print(f"Output successfully written to: {output_file_path}")
+    print(f"Output also successfully written to: {base_output_file_path}")
+
+
+if __name__ == "__main__":
+    # Prompt user for the base directory
+    directory_path = input("Enter the base directory path: ")
+    run(directory_path)
@@ -0,0 +1,217 @@
+import argparse
+import importlib.util
+import os
+import sys
+import traceback
+
+from rubric_batch import SUMMARY_FILE, run_batch
+from rubric_layout import folder_layout
+from rubric_pipeline import INTERMEDIATE_FORMATS, STAGES, load_stage, run_pipeline, stage_directory
+
+# Command line entry point for unattended runs (scheduled tasks, batch files), instead of the input() prompt at the
+# start of every script:
+#   python rubric.py run --ay AY_23_24 --root C:/Rubric        every stage, as rubric_pipeline.py does
+#   python rubric.py stage "Success part 1" --ay AY_23_24      one script on its own, writing all of its workbooks
+#   python rubric.py batch --root C:/Rubric                    every AY_**_** folder, plus a cross-year summary
+# The folder layout under the AY folder (INSTRUCTIONAL EFFORT PART 1, SUCCESS, FACULTY SUCCESS, OUTPUT, ...) and the
+# default run options are read from rubric.toml next to this file (or the file given with --config; .yaml / .yml
+# files work too when PyYAML is installed). Options on the command line override the config.
+# Nothing is prompted for. The exit code is 0 when the run finished, 1 when a stage (or a batch year) failed, 2 for a
+# bad command line or config file.
+
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG = os.path.join(SCRIPT_DIRECTORY, 'rubric.toml')
+
+# Settings allowed in the [run] table and the type each must have
+RUN_SETTINGS = {
+    'write_intermediates': bool,
+    'cache': bool,
+    'intermediate_format': str,
+    'workers': int,
+    'loader_workers': int,
+    'read_only_inputs': bool,
+}
+
+
+# Function to read the config file (TOML, or YAML when PyYAML is installed)
+def read_config(config_path):
+    if config_path.lower().endswith(('.yaml', '.yml')):
+        if importlib.util.find_spec('yaml') is None:
+            raise ImportError("Reading a YAML config needs PyYAML. Install it with: pip install pyyaml")
+        import yaml
+        with open(config_path, encoding='utf-8') as file:
+            config = yaml.safe_load(file) or {}
+    else:
+        if sys.version_info >= (3, 11):
+            import tomllib
+        elif importlib.util.find_spec('tomli') is not None:
+            import tomli as tomllib
+        else:
+            raise ImportError("Reading rubric.toml on Python 3.10 or older needs tomli. Install it with: pip install tomli")
+        with open(config_path, 'rb') as file:
+            config = tomllib.load(file)
+
+    if not isinstance(config, dict):
+        raise ValueError(f"{config_path} must hold a table of settings.")
+    unknown = set(config) - {'root', 'ay', 'folders', 'run'}
+    if unknown:
+        raise ValueError(f"Unknown settings in {config_path}: {', '.join(sorted(unknown))}.")
+
+    # Check the folder names now rather than when the first stage starts
+    folder_layout(config.get('folders'))
+
+    run_settings = config.get('run') or {}
+    for name, value in run_settings.items():
+        if name not in RUN_SETTINGS:
+            raise ValueError(f"Unknown setting '{name}' in the [run] table of {config_path}.")
+        if not isinstance(value, RUN_SETTINGS[name]) or (RUN_SETTINGS[name] is int and isinstance(value, bool)):
+            raise ValueError(f"Setting '{name}' in {config_path} must be a {RUN_SETTINGS[name].__name__}.")
+    if run_settings.get('intermediate_format', 'memory') not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"intermediate_format in {config_path} must be one of: {', '.join(INTERMEDIATE_FORMATS)}.")
+    return config
+
+
+# Function to load the config given with --config, or rubric.toml when there is one
+def load_config(config_path):
+    if config_path is None:
+        if not os.path.exists(DEFAULT_CONFIG):
+            return {}
+        config_path = DEFAULT_CONFIG
+    elif not os.path.exists(config_path):
+        raise FileNotFoundError(f"The config file '{config_path}' does not exist.")
+    return read_config(config_path)
+
+
+# Function to work out the AY folder from --root / --ay (or the config)
+def ay_directory(args, config):
+    root = args.root or config.get('root')
+    ay = args.ay or config.get('ay')
+    if root is None and ay is None:
+        raise ValueError("Give the AY folder with --root (and --ay), or set root / ay in the config.")
+    # Without an AY, root is the AY_**_** folder itself
+    return os.path.join(root or os.getcwd(), ay) if ay else root
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='rubric', description="Run the rubric stages without prompting.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Options every command shares
+    location = argparse.ArgumentParser(add_help=False)
+    location.add_argument('--config', default=None,
+                          help="TOML (or YAML) file with the folder layout and run options (default: rubric.toml)")
+    location.add_argument('--root', default=None, help="folder holding the AY_**_** folders (or the AY folder itself)")
+
+    # Options of the pipeline runs (run and batch)
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument('--write-intermediates', action='store_true', default=None,
+                         help="also write every per-stage workbook")
+    options.add_argument('--workers', type=int, default=None,
+                         help="number of stages to run at once (1 = one after another)")
+    options.add_argument('--no-cache', dest='cache', action='store_false', default=None,
+                         help="run every stage even if its inputs are unchanged")
+    options.add_argument('--intermediate-format', choices=INTERMEDIATE_FORMATS, default=None,
+                         help="how stages hand their results on: in memory or as Parquet files (needs pyarrow)")
+    options.add_argument('--loader-workers', type=int, default=None,
+                         help="processes used to read multi-file extracts within a stage (1 = one file at a time)")
+    options.add_argument('--read-only-inputs', action='store_true', default=None,
+                         help="never write pivots or updated sheets into the input extracts")
+
+    run_parser = commands.add_parser('run', parents=[location, options], help="run every stage for one AY")
+    run_parser.add_argument('--ay', default=None, help="AY folder under --root, e.g. AY_23_24")
+
+    stage_parser = commands.add_parser('stage', parents=[location], help="run one script on its own")
+    stage_parser.add_argument('--ay', default=None, help="AY folder under --root, e.g. AY_23_24")
+    stage_parser.add_argument('stage', choices=[stage_name for stage_name, _, _, _ in STAGES])
+    stage_parser.add_argument('--read-only-inputs', action='store_true', default=None,
+                              help="keep the input extracts untouched; the Faculty Success scripts hand their "
+                                   "results on through FACULTY SUCCESS/RESULTS")
+
+    batch_parser = commands.add_parser('batch', parents=[location, options],
+                                       help="run every AY_**_** folder under --root and write a cross-year summary")
+    batch_parser.add_argument('--jobs', type=int, default=None,
+                              help="number of academic years to run at once (default: all of them)")
+    batch_parser.add_argument('--summary', default=None,
+                              help=f"where to write the cross-year summary (default: {SUMMARY_FILE} in --root)")
+    return parser
+
+
+# Function to combine the run options on the command line with the [run] table of the config
+def run_settings(args, config):
+    settings = dict(config.get('run') or {})
+    for name in RUN_SETTINGS:
+        if getattr(args, name) is not None:
+            settings[name] = getattr(args, name)
+
+    # The stage processes inherit the environment, so this reaches rubric_excel.read_extracts in every stage
+    if settings.get('loader_workers'):
+        os.environ['RUBRIC_LOADER_WORKERS'] = str(settings['loader_workers'])
+    if settings.get('read_only_inputs'):
+        os.environ['RUBRIC_READ_ONLY_INPUTS'] = '1'
+
+    return {
+        'write_intermediates': settings.get('write_intermediates', False),
+        'workers': settings.get('workers'),
+        'use_cache': settings.get('cache', True),
+        'intermediate_format': settings.get('intermediate_format', 'memory'),
+        'folders': config.get('folders'),
+    }
+
+
+# Function to run every stage with the command line options, falling back to the config
+def run_command(args, config):
+    run_pipeline(ay_directory(args, config), **run_settings(args, config))
+
+
+# Function to run every AY under the root, by default one year per process with its stages one after another
+def batch_command(args, config):
+    settings = run_settings(args, config)
+    settings['workers'] = settings['workers'] or 1
+    run_batch(args.root or config.get('root'), jobs=args.jobs, summary_path=args.summary, **settings)
+
+
+# Function to run one script exactly as it runs on its own, minus the prompt
+def stage_command(args, config):
+    layout = folder_layout(config.get('folders'))
+    # Read-only inputs (rubric_store.read_only_inputs), from the command line or the [run] table
+    if args.read_only_inputs or (config.get('run') or {}).get('read_only_inputs'):
+        os.environ['RUBRIC_READ_ONLY_INPUTS'] = '1'
+    for stage_name, script_name, folder, _ in STAGES:
+        if stage_name == args.stage:
+            load_stage(script_name).run(stage_directory(ay_directory(args, config), folder, layout), layout=layout)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+        if args.command == 'batch':
+            if not (args.root or config.get('root')):
+                raise ValueError("Give the folder holding the AY folders with --root, or set root in the config.")
+        else:
+            ay_directory(args, config)
+    except (ImportError, OSError, ValueError) as e:
+        parser.error(str(e))
+
+    try:
+        if args.command == 'run':
+            run_command(args, config)
+        elif args.command == 'batch':
+            batch_command(args, config)
+        else:
+            stage_command(args, config)
+    except KeyboardInterrupt:
+        print("Stopped.", file=sys.stderr)
+        return 130
+    except Exception as e:
+        # Full traceback for the log of a scheduled run, then the message on its own
+        traceback.print_exc()
+        print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
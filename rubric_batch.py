@@ -0,0 +1,110 @@
+import os
+import time
+import traceback
+
+import pandas as pd
+
+from rubric_calendar import AY_PATTERN
+from rubric_excel import worker_pool
+from rubric_pipeline import run_pipeline
+
+# Batch runs over several academic years (python rubric.py batch --root ...), e.g. to recompute every historical
+# year after the weights change.
+# Every AY_XX_XX folder directly under the root is run through the full pipeline in its own worker process (the
+# stages of one year run one after another inside that process unless asked otherwise). Each year keeps its own
+# FINAL_OUTPUT.xlsx and build cache. The Updated HEGIS Codes sheet of every year is then combined into
+# CROSS_YEAR_SUMMARY.xlsx in the root: all scores in one long table, the rubric total and standardized scores as
+# HEGIS Code x AY tables, and the time (or error) of every year.
+# The CPUs are split between the years running at once, so their stage and loader pools share them too.
+
+SUMMARY_FILE = 'CROSS_YEAR_SUMMARY.xlsx'
+
+# Scores shown as HEGIS Code x AY tables
+TREND_COLUMNS = ['Rubric Total Score', 'Rubric Standardized Score']
+
+
+# Function to list the AY folders under root, oldest year first
+def find_academic_years(root):
+    years = []
+    for name in os.listdir(root):
+        match = AY_PATTERN.fullmatch(name)
+        if match and os.path.isdir(os.path.join(root, name)):
+            years.append((int(f"20{match.group(1)}"), int(f"20{match.group(2)}"), name))
+    return sorted(years)
+
+
+# Function run by the batch workers: the whole pipeline for one AY, returning its final scores or the error
+def run_year(ay_directory, pipeline_options):
+    start_time = time.perf_counter()
+    try:
+        store = run_pipeline(ay_directory, **pipeline_options)
+        scores = store.get('FINAL_OUTPUT', 'Updated HEGIS Codes')
+        return scores, time.perf_counter() - start_time, None
+    except Exception as e:
+        traceback.print_exc()
+        return None, time.perf_counter() - start_time, f"{type(e).__name__}: {e}"
+
+
+def run_batch(root, jobs=None, summary_path=None, workers=1, **pipeline_options):
+    """
+    Run the pipeline for every AY folder under root, jobs years at a time (all of them at once by default), and write
+    the cross-year summary (root/CROSS_YEAR_SUMMARY.xlsx unless summary_path is given). workers is the number of
+    stages run at once within one year; the other options are passed on to run_pipeline.
+    Returns the long score table. A year that fails is listed in the summary, and a RuntimeError naming the failed
+    years is raised after the summary has been written.
+    """
+    root = os.path.normpath(root)
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"The directory '{root}' does not exist. Please check the path and try again.")
+    years = find_academic_years(root)
+    if not years:
+        raise FileNotFoundError(f"No AY_XX_XX folders found in {root}.")
+    print(f"Academic years found: {', '.join(name for _, _, name in years)}")
+
+    pipeline_options['workers'] = workers
+    jobs = min(jobs or len(years), len(years))
+    batch_start = time.perf_counter()
+
+    directories = [os.path.join(root, name) for _, _, name in years]
+    if jobs > 1:
+        with worker_pool(jobs) as executor:
+            results = list(executor.map(run_year, directories, [pipeline_options] * len(directories)))
+    else:
+        results = [run_year(directory, pipeline_options) for directory in directories]
+
+    # Combine the years into one long table
+    frames = []
+    runs = []
+    for (start_year, end_year, name), (scores, seconds, error) in zip(years, results):
+        runs.append({'AY': name, 'Status': 'failed' if error else 'ok', 'Seconds': round(seconds, 2),
+                     'Error': error or ''})
+        if error:
+            print(f"=== {name} failed: {error} ===")
+            continue
+        scores.insert(0, 'AY', name)
+        scores.insert(1, 'Start Year', start_year)
+        scores.insert(2, 'End Year', end_year)
+        frames.append(scores)
+    all_scores = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['AY', 'HEGIS Code'])
+
+    summary_path = summary_path or os.path.join(root, SUMMARY_FILE)
+    with pd.ExcelWriter(summary_path, engine='xlsxwriter') as writer:
+        all_scores.to_excel(writer, index=False, sheet_name='All Years')
+        for column in TREND_COLUMNS:
+            if column in all_scores.columns:
+                # HEGIS Codes in the order they first appear, years oldest first
+                trend = all_scores.pivot_table(index='HEGIS Code', columns='AY', values=column, sort=False)
+                trend = trend.reindex(columns=[name for _, _, name in years if name in trend.columns])
+                trend.rename_axis(columns=None).reset_index().to_excel(writer, index=False, sheet_name=column[:31])
+        pd.DataFrame(runs).to_excel(writer, index=False, sheet_name='Runs')
+    print(f"Cross-year summary saved to {summary_path}")
+
+    print("\nAcademic year timings:")
+    for run in runs:
+        print(f"  {run['AY']:<12} {run['Seconds']:8.2f} s  {run['Status']}")
+    print(f"  {'Wall clock':<12} {time.perf_counter() - batch_start:8.2f} s")
+
+    failed = [run['AY'] for run in runs if run['Status'] == 'failed']
+    if failed:
+        raise RuntimeError(f"The pipeline failed for {', '.join(failed)} (see the Runs sheet of {summary_path}).")
+    return all_scores
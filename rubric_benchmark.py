@@ -0,0 +1,355 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from rubric_calendar import AcademicYear
+from rubric_excel import open_streaming_workbook, stream_sheet
+from rubric_pipeline import load_stage
+from rubric_scoring import total_or_value
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Micro-benchmarks for the hot spots of the rubric scripts, run on synthetic data (no AY folder needed).
+# python rubric_benchmark.py concat
+#   Compares accumulating DataFrames with pd.concat inside a loop (how the loaders and insert_sums used to work)
+#   against collecting the pieces and concatenating once. The per-item time of the current code should stay flat as
+#   the number of files / HEGIS Codes grows (linear scaling), while the old pattern grows with the size of the result.
+# python rubric_benchmark.py scores
+#   Times the row-by-row apply(axis=1) score columns against the code the scripts run now (rubric_scoring.py, and the
+#   sch_per_fte functions of Instructional Effort part 1 / part 2) and checks both give identical results. The Grand
+#   Totals include zero, negative and missing values; the rows the old lambda could not score are reported separately.
+# python rubric_benchmark.py dates
+#   Times the AY date filter of the Faculty Success categories on text date columns of growing size: pd.to_datetime
+#   with format inference and .dt.year.isin (how each category used to filter) against AcademicYear.date_mask
+#   (rubric_calendar.py), and checks both keep the same rows.
+# python rubric_benchmark.py totals
+#   Times the HBG / USMGC / TOTAL rows of Engagement Part 2 (HIP) built with a loop over the HEGIS Codes (how Stage 4
+#   used to do it) against hip_campus_rows of the script (the reindex / groupby helpers of rubric_totals.py), and
+#   checks both give the same rows.
+# python rubric_benchmark.py writer
+#   Writes detail sheets of growing size with DataFrame.to_excel and with the streaming writer (rubric_excel.py), each in
+#   a fresh process, and reports how much the peak memory (RSS) grew while writing. The streaming column should stay
+#   flat as the rows grow; to_excel keeps every cell in memory until the file is saved. (On Windows, where RSS is not
+#   available from Python, the peak of Python allocations is reported instead.)
+
+
+# Function to time a call (best of a few runs, so one slow run does not skew the table)
+def best_time(function, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+# Function to build a fake extract file as read_extract would return it
+def fake_extract(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ID': rng.integers(10000000, 99999999, rows),
+        'HEGIS Code': rng.choice(['ACCOUNT', 'ART', 'HISTORY', 'PSYCH'], rows),
+        'Term': rng.choice([4241, 4243, 4245], rows),
+        'Org Descr': rng.choice(['Accounting', 'Art', 'History', 'Psychology'], rows),
+        'Pri Prog Camp': rng.choice(['HBG', 'GC', 'ONLNE'], rows),
+    })
+
+
+# Function to build a Success part 2 style pivot with code_count HEGIS Codes
+def fake_success_pivot(code_count):
+    index = pd.MultiIndex.from_product([[f'{code:05d}' for code in range(code_count)], ['Gulf Coast', 'Hattiesburg']],
+                                       names=['HEGIS Code', 'Campus'])
+    rng = np.random.default_rng(code_count)
+    pivot_table = pd.DataFrame({'Y': rng.integers(0, 50, len(index)), 'Total': rng.integers(50, 100, len(index))}, index=index)
+    pivot_table.columns.name = 'COMPLETED DEGREE (Y/N)'
+    pivot_table['JR GRAD RATE'] = pivot_table['Y'] / pivot_table['Total']
+    pivot_table['Score'] = pivot_table['JR GRAD RATE'] * 0.175
+    return pivot_table
+
+
+# The old loader pattern: grow the combined frame one file at a time
+def concat_in_loop(frames):
+    combined_data = pd.DataFrame()
+    for df in frames:
+        combined_data = pd.concat([combined_data, df], ignore_index=True)
+    return combined_data
+
+
+# The old insert_sums from Success part 2.py
+def insert_sums_in_loop(df, sums):
+    result = pd.DataFrame()
+    for hegis_code in df.index.get_level_values('HEGIS Code').unique():
+        temp_df = df.xs(hegis_code, level='HEGIS Code', drop_level=False)
+        result = pd.concat([result, temp_df])
+        sum_row = pd.DataFrame(sums.loc[hegis_code]).T
+        sum_row.index = pd.MultiIndex.from_tuples([(hegis_code, 'SUM')], names=['HEGIS Code', 'Campus'])
+        result = pd.concat([result, sum_row])
+    return result
+
+
+def benchmark_concat(file_counts, code_counts, rows_per_file):
+    print(f"Combining extract files ({rows_per_file:,} rows each)")
+    print(f"  {'files':>8} {'in loop':>10} {'per file':>10} {'once':>10} {'per file':>10}")
+    for file_count in file_counts:
+        frames = [fake_extract(rows_per_file, seed) for seed in range(file_count)]
+        loop_seconds = best_time(lambda: concat_in_loop(frames))
+        once_seconds = best_time(lambda: pd.concat(frames, ignore_index=True))
+        print(f"  {file_count:>8} {loop_seconds:>9.3f}s {loop_seconds / file_count * 1000:>8.3f}ms "
+              f"{once_seconds:>9.3f}s {once_seconds / file_count * 1000:>8.3f}ms")
+
+    insert_sums = load_stage('Success part 2.py').insert_sums
+    print("\nSuccess part 2 insert_sums (one SUM row per HEGIS Code)")
+    print(f"  {'codes':>8} {'in loop':>10} {'per code':>10} {'current':>10} {'per code':>10}")
+    for code_count in code_counts:
+        pivot_table = fake_success_pivot(code_count)
+        hegis_sums = pivot_table.groupby('HEGIS Code').sum()
+        loop_seconds = best_time(lambda: insert_sums_in_loop(pivot_table, hegis_sums), repeats=1)
+        current_seconds = best_time(lambda: insert_sums(pivot_table, hegis_sums))
+        print(f"  {code_count:>8} {loop_seconds:>9.3f}s {loop_seconds / code_count * 1000:>8.3f}ms "
+              f"{current_seconds:>9.3f}s {current_seconds / code_count * 1000:>8.3f}ms")
+
+
+# Function to build a HEGIS Code x campus table like the ones Engagement 1.1 (CAMPUS, score, score_total) and
+# Instructional Effort part 1 (Campus, SCH Score, TOTAL) / part 2 (ID) score, with zero, negative and missing Grand Totals
+def fake_campus_table(code_count):
+    rng = np.random.default_rng(code_count)
+    campuses = ['hbg', 'usmgc', 'total']
+    df = pd.DataFrame({
+        'HEGIS Code': np.repeat([f'{code:05d}' for code in range(code_count)], len(campuses)),
+        'CAMPUS': campuses * code_count,
+        'score': rng.random(code_count * len(campuses)) * 10,
+        'Grand Total': rng.choice([0.0, -2.5, np.nan, 2.5, 7.0, 13.0], code_count * len(campuses)),
+        'ID': rng.integers(0, 40, code_count * len(campuses)),
+    })
+    totals = df[df['CAMPUS'].isin(['hbg', 'usmgc'])].groupby('HEGIS Code')['score'].sum().reset_index()
+    df = df.merge(totals, on='HEGIS Code', how='left', suffixes=('', '_total'))
+    df.loc[df.index % 7 == 0, 'score_total'] = np.nan  # a few codes without campus rows
+
+    # Instructional Effort part 1: the total rows have a blank Campus, their SCH Score in TOTAL and none in SCH Score
+    is_total = df['CAMPUS'] == 'total'
+    df['Campus'] = df['CAMPUS'].str.upper().where(~is_total, '')
+    df['SCH Score'] = df['score'].where(~is_total)
+    df['TOTAL'] = df['score_total'].where(is_total)
+    return df
+
+
+# The SCH/FTE lambda of Instructional Effort part 1. apply gives it object rows, so it divides Python floats and a
+# Grand Total of 0 raises ZeroDivisionError (the stage stopped there)
+def sch_per_fte_in_apply(row):
+    return row['TOTAL'] / row['Grand Total'] if row['Campus'] == '' else row['SCH Score'] / row['Grand Total']
+
+
+# Function to check two results are the same values (bit for bit) with the same dtype
+def same_result(expected, actual):
+    return expected.dtype == actual.dtype and np.array_equal(expected.to_numpy(), actual.to_numpy(), equal_nan=True)
+
+
+def benchmark_scores(code_counts):
+    sch_per_fte_part_1 = load_stage('Instructional Effort part 1.py').sch_per_fte
+    sch_per_fte_part_2 = load_stage('Instructional Effort part 2.py').sch_per_fte
+
+    # (name, row-by-row version, current version, rows the row-by-row version can score)
+    calculations = [
+        ("TOTAL (Engagement 1.1)",
+         lambda df: df.apply(lambda row: row['score_total'] if row['CAMPUS'] == 'total' else row['score'], axis=1),
+         lambda df: total_or_value(df, 'CAMPUS', 'total', 'score_total', 'score'),
+         lambda df: df),
+        ("SCH/FTE (Instructional Effort part 1)",
+         lambda df: df.apply(sch_per_fte_in_apply, axis=1),
+         sch_per_fte_part_1,
+         lambda df: df[df['Grand Total'] != 0]),
+        ("SCH/FTE (Instructional Effort part 2)",
+         lambda df: df.apply(lambda row: row['ID'] / row['Grand Total'] if row['Grand Total'] > 0 else 0, axis=1),
+         sch_per_fte_part_2,
+         lambda df: df),
+    ]
+
+    print(f"  {'calculation':<40} {'rows':>8} {'apply':>10} {'vectorized':>11} {'identical':>10}")
+    failures = 0
+    for code_count in code_counts:
+        df = fake_campus_table(code_count)
+        for name, row_wise, vectorized, scored_rows in calculations:
+            rows = scored_rows(df)
+            apply_seconds = best_time(lambda: row_wise(rows), repeats=1)
+            vectorized_seconds = best_time(lambda: vectorized(rows))
+            identical = same_result(row_wise(rows), vectorized(rows))
+            failures += not identical
+            print(f"  {name:<40} {len(rows):>8,} {apply_seconds:>9.3f}s {vectorized_seconds:>10.4f}s {'yes' if identical else 'NO':>10}")
+
+        # The rows left out above: the part 1 lambda stopped on a Grand Total of 0, the script divides anyway
+        zero_fte = df[df['Grand Total'] == 0]
+        try:
+            zero_fte.apply(sch_per_fte_in_apply, axis=1)
+            row_wise_result = "no error"
+        except ZeroDivisionError:
+            row_wise_result = "ZeroDivisionError"
+        sch_per_fte = sch_per_fte_part_1(zero_fte)
+        print(f"  {'  Grand Total 0 (part 1)':<40} {len(zero_fte):>8,}  apply: {row_wise_result}, script: "
+              f"{np.isinf(sch_per_fte).sum():,} inf, {sch_per_fte.isna().sum():,} NaN")
+
+    if failures:
+        raise SystemExit(f"{failures} vectorized calculation(s) differ from the row-by-row version.")
+
+
+# Function to build an activity export with text START_START / START_END dates (as some extracts deliver them)
+def fake_activity_dates(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, (rows, 2)).ravel(), unit='D')
+    text = pd.Series(days.strftime('%m/%d/%Y')).to_numpy().reshape(rows, 2)
+    df = pd.DataFrame({'START_START': text[:, 0], 'START_END': text[:, 1]})
+    df.loc[df.index % 50 == 0, 'START_END'] = None  # a few activities without an end date
+    return df
+
+
+def benchmark_dates(row_counts):
+    def year_filter(df):
+        return (pd.to_datetime(df['START_START'], errors='coerce').dt.year.isin([2023, 2024]) &
+                pd.to_datetime(df['START_END'], errors='coerce').dt.year.isin([2023, 2024])).to_numpy()
+
+    def calendar_filter(df):
+        academic_year = AcademicYear(2023, 2024)
+        return academic_year.date_mask(df, 'START_START') & academic_year.date_mask(df, 'START_END')
+
+    print(f"  {'rows':>8} {'to_datetime':>12} {'calendar':>10} {'identical':>10}")
+    failures = 0
+    for rows in row_counts:
+        df = fake_activity_dates(rows)
+        year_seconds = best_time(lambda: year_filter(df), repeats=1)
+        calendar_seconds = best_time(lambda: calendar_filter(df))
+        identical = np.array_equal(year_filter(df), calendar_filter(df))
+        failures += not identical
+        print(f"  {rows:>8,} {year_seconds:>11.3f}s {calendar_seconds:>9.3f}s {'yes' if identical else 'NO':>10}")
+
+    if failures:
+        raise SystemExit(f"{failures} date filter(s) differ from the to_datetime version.")
+
+
+HIP_COLUMNS = ['HEGIS Code', 'Home Campus/Teaching Site (Most Recent)', 'HIP.1', 'ASL', 'Count', 'sum', 'Weighted Sum']
+
+
+# Function to build a merged HIP table (Engagement Part 2, Stage 4) with code_count HEGIS Codes and a few campuses each
+def fake_hip_table(code_count, seed=0):
+    rng = np.random.default_rng(seed)
+    campuses = np.array(['HBG', 'USMGC', 'Online'])
+    rows = [(f"H{code:05d}", campus) for code in rng.permutation(code_count) for campus in campuses[rng.random(3) < 0.6]]
+    df = pd.DataFrame(rows, columns=HIP_COLUMNS[:2])
+    df['HIP.1'] = rng.integers(0, 10, len(df))
+    df['ASL'] = rng.integers(0, 60, len(df)).astype(float)
+    df['Count'] = rng.integers(0, 5, len(df))
+    df['sum'] = df[['HIP.1', 'ASL', 'Count']].sum(axis=1)
+    df['Weighted Sum'] = df['sum'] * 0.175
+    return df
+
+
+# The old Stage 4 loop of Engagement Part 2.py
+def hip_rows_in_loop(df_final):
+    final_rows = []
+    for hegis_code in df_final['HEGIS Code'].unique():
+        sub_df = df_final[df_final['HEGIS Code'] == hegis_code]
+        for campus in ['HBG', 'USMGC']:
+            if campus in sub_df['Home Campus/Teaching Site (Most Recent)'].values:
+                final_rows.append(sub_df[sub_df['Home Campus/Teaching Site (Most Recent)'] == campus])
+            else:
+                final_rows.append(pd.DataFrame([[hegis_code, campus, 0, 0, 0, 0, 0]], columns=df_final.columns))
+        total_values = sub_df[['HIP.1', 'ASL', 'Count']].sum()
+        final_rows.append(pd.DataFrame([[hegis_code, 'TOTAL', total_values['HIP.1'], total_values['ASL'],
+                                         total_values['Count'], total_values.sum(), total_values.sum() * 0.175]],
+                                       columns=df_final.columns))
+    return pd.concat(final_rows, ignore_index=True).drop_duplicates()
+
+
+def benchmark_totals(code_counts):
+    hip_rows = load_stage('Engagement Part 2.py').hip_campus_rows
+    print(f"  {'codes':>8} {'rows':>8} {'loop':>10} {'reindex':>10} {'identical':>10}")
+    failures = 0
+    for code_count in code_counts:
+        df = fake_hip_table(code_count)
+        loop_seconds = best_time(lambda: hip_rows_in_loop(df), repeats=1)
+        reindex_seconds = best_time(lambda: hip_rows(df))
+        identical = hip_rows_in_loop(df).equals(hip_rows(df))  # same values and dtypes, column by column
+        failures += not identical
+        print(f"  {code_count:>8,} {len(df):>8,} {loop_seconds:>9.3f}s {reindex_seconds:>9.4f}s {'yes' if identical else 'NO':>10}")
+
+    if failures:
+        raise SystemExit(f"{failures} HIP table(s) differ from the loop version.")
+
+
+# Function to read the peak memory (RSS) of this process so far, in MB
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KB on Linux
+
+
+# Function run in a fresh process: write a fake detail sheet and return the seconds taken and the peak memory growth
+def measure_write(writer_name, rows):
+    df = fake_extract(rows, seed=rows)
+    df['Score'] = df['Term'] * 0.175
+
+    with tempfile.TemporaryDirectory() as folder:
+        file_path = os.path.join(folder, 'detail.xlsx')
+        if resource is None:
+            tracemalloc.start()
+        else:
+            before = peak_rss_mb()
+
+        start_time = time.perf_counter()
+        if writer_name == 'to_excel':
+            df.to_excel(file_path, sheet_name='Combined Data', index=False)
+        else:
+            with open_streaming_workbook(file_path) as workbook:
+                stream_sheet(workbook, 'Combined Data', df)
+        seconds = time.perf_counter() - start_time
+
+        if resource is None:
+            growth = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        else:
+            growth = peak_rss_mb() - before
+    return seconds, growth
+
+
+def benchmark_writer(row_counts):
+    print(f"Writing a {len(fake_extract(1, 0).columns) + 1}-column detail sheet "
+          f"(peak {'RSS' if resource is not None else 'Python memory'} growth while writing)")
+    print(f"  {'rows':>8} {'to_excel':>10} {'memory':>10} {'streamed':>10} {'memory':>10}")
+    for rows in row_counts:
+        results = {}
+        for writer_name in ['to_excel', 'stream']:
+            # A new process for every measurement, so one run's peak does not hide the next one's
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results[writer_name] = executor.submit(measure_write, writer_name, rows).result()
+        (excel_seconds, excel_mb), (stream_seconds, stream_mb) = results['to_excel'], results['stream']
+        print(f"  {rows:>8,} {excel_seconds:>9.2f}s {excel_mb:>8.1f}MB {stream_seconds:>9.2f}s {stream_mb:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rubric scripts on synthetic data.")
+    parser.add_argument('benchmark', choices=['concat', 'scores', 'dates', 'totals', 'writer'], help="which benchmark to run")
+    parser.add_argument('--files', type=int, nargs='+', default=[10, 50, 100, 200], help="file counts to try")
+    parser.add_argument('--codes', type=int, nargs='+', default=[100, 250, 500, 1000], help="HEGIS Code counts to try")
+    parser.add_argument('--rows', type=int, default=2000, help="rows per fake extract file")
+    parser.add_argument('--date-rows', type=int, nargs='+', default=[10000, 100000, 500000],
+                        help="activity export sizes to filter by date")
+    parser.add_argument('--sheet-rows', type=int, nargs='+', default=[25000, 50000, 100000, 200000],
+                        help="detail sheet sizes to write")
+    args = parser.parse_args()
+
+    if args.benchmark == 'concat':
+        benchmark_concat(args.files, args.codes, args.rows)
+    elif args.benchmark == 'scores':
+        benchmark_scores(args.codes)
+    elif args.benchmark == 'dates':
+        benchmark_dates(args.date_rows)
+    elif args.benchmark == 'totals':
+        benchmark_totals(args.codes)
+    elif args.benchmark == 'writer':
+        benchmark_writer(args.sheet_rows)
@@ -0,0 +1,133 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import re
+
+import pandas as pd
+
+# Incremental rebuild cache for rubric_pipeline.py.
+# Every stage gets a key: a hash of its script (and the rubric_* helpers it imports), the content of the source
+# extracts it reads, and the keys of the stages it depends on. After a stage runs, the artifacts it produced are
+# pickled under .rubric_cache in the AY folder together with that key. On the next run a stage whose key is unchanged
+# is not run again; its artifacts are loaded from the cache instead.
+# Because the keys chain through the dependencies, a changed extract only re-runs the stages that read it and the
+# stages downstream of them (e.g. a new ET_RAF_COMPLETIONS file re-runs Success part 1/2 and FINAL OUTPUT only).
+
+CACHE_FOLDER = '.rubric_cache'
+
+
+# Function to hash the content of a file
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Function to list the files matching a stage's input patterns, relative to the AY folder
+def input_files(root, patterns):
+    files = set()
+    for pattern in patterns:
+        for file_path in glob.glob(os.path.join(glob.escape(root), pattern)):
+            if os.path.isfile(file_path):
+                files.add(os.path.relpath(file_path, root).replace(os.sep, '/'))
+    return sorted(files)
+
+
+# Function to list a script and the rubric_* helper modules it imports (directly or through other helpers)
+def script_files(script_path):
+    script_directory = os.path.dirname(script_path)
+    files = []
+    pending = [script_path]
+    while pending:
+        file_path = pending.pop()
+        if file_path in files or not os.path.exists(file_path):
+            continue
+        files.append(file_path)
+        with open(file_path, encoding='utf-8') as file:
+            source = file.read()
+        for module_name in re.findall(r'^\s*(?:from|import)\s+(rubric_\w+)', source, flags=re.MULTILINE):
+            pending.append(os.path.join(script_directory, module_name + '.py'))
+    return sorted(files)
+
+
+def stage_key(script_path, root, input_hashes, dependency_keys, variant=''):
+    """
+    Hash of everything a stage's result depends on: its code, its source extracts and its upstream stages.
+    variant separates results that are stored differently (e.g. in memory vs as Parquet files).
+    """
+    digest = hashlib.sha256()
+    digest.update(pd.__version__.encode())
+    digest.update(variant.encode())
+    for file_path in script_files(script_path):
+        digest.update(os.path.basename(file_path).encode())
+        digest.update(hash_file(file_path).encode())
+    for relative_path, file_hash in sorted(input_hashes.items()):
+        digest.update(relative_path.encode())
+        digest.update(file_hash.encode())
+    for dependency_key in dependency_keys:
+        digest.update(dependency_key.encode())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    One manifest (<stage>.json) and one pickle of produced artifacts (<stage>.pkl) per stage, under root/.rubric_cache.
+    Only the most recent build of each stage is kept.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.folder = os.path.join(root, CACHE_FOLDER)
+
+    def _paths(self, stage_name):
+        file_name = re.sub(r'[^A-Za-z0-9]+', '_', stage_name).strip('_')
+        return os.path.join(self.folder, file_name + '.json'), os.path.join(self.folder, file_name + '.pkl')
+
+    def lookup(self, stage_name, key, output_patterns=()):
+        # Return the cached artifacts when the stage was last built with the same key, otherwise None
+        manifest_path, artifacts_path = self._paths(stage_name)
+        if not (os.path.exists(manifest_path) and os.path.exists(artifacts_path)):
+            return None
+        with open(manifest_path, encoding='utf-8') as file:
+            manifest = json.load(file)
+        if manifest.get('key') != key:
+            return None
+
+        # Files the stage writes (e.g. FINAL_OUTPUT.xlsx) must still be there, unchanged
+        for relative_path, file_hash in manifest.get('outputs', {}).items():
+            file_path = os.path.join(self.root, relative_path)
+            if not os.path.exists(file_path) or hash_file(file_path) != file_hash:
+                return None
+        if set(input_files(self.root, output_patterns)) - set(manifest.get('outputs', {})):
+            return None
+
+        try:
+            with open(artifacts_path, 'rb') as file:
+                return pickle.load(file)
+        except Exception as e:
+            print(f"Could not read the cached artifacts for {stage_name}: {e}")
+            return None
+
+    def record(self, stage_name, key, input_hashes, artifacts, output_patterns=()):
+        # Save what the stage produced so the next run can reuse it
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        manifest_path, artifacts_path = self._paths(stage_name)
+
+        with open(artifacts_path, 'wb') as file:
+            pickle.dump(artifacts, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        manifest = {
+            'stage': stage_name,
+            'key': key,
+            'inputs': input_hashes,
+            'artifacts': sorted(artifacts),
+            'outputs': {relative_path: hash_file(os.path.join(self.root, relative_path))
+                        for relative_path in input_files(self.root, output_patterns)},
+        }
+        with open(manifest_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
@@ -0,0 +1,93 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# The academic year of a run, worked out once from the AY_XX_XX folder name, and the date-window filter built on it.
+# AcademicYear.date_mask(df, column) keeps the rows whose date falls in the year's window:
+#   'calendar'  1 January of the start year up to 31 December of the end year, i.e. the year of the date is the start or
+#               the end year (what .dt.year.isin([start_year, end_year]) always did)
+#   'fiscal'    1 July of the start year up to 30 June of the end year (FISCAL_YEAR_START_MONTH), the true AY bounds
+# Every call parses the date column of the frame it is given (nothing is kept between calls) and compares the dates
+# with the window bounds. Text dates are parsed one distinct value at a time, with an explicit format when the whole
+# column is in one of DATE_FORMATS, and with pandas' format inference (as pd.to_datetime(errors='coerce')) otherwise.
+
+# AY_23_24 -> 2023, 2024
+AY_PATTERN = re.compile(r'AY_(\d{2})_(\d{2})')
+
+# First month of the fiscal year ('fiscal' window)
+FISCAL_YEAR_START_MONTH = 7
+
+# Explicit formats tried for text date columns, in order
+DATE_FORMATS = ['ISO8601', '%m/%d/%Y', '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %H:%M']
+
+DATE_WINDOWS = ['calendar', 'fiscal']
+
+
+def parse_dates(values):
+    """
+    values (a Series) as a datetime64 array, with NaT where a value is not a date: the same dates as
+    pd.to_datetime(values, errors='coerce'), but text is parsed once per distinct value and with an explicit format
+    when every distinct value matches one.
+    """
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        # Compare wall-clock dates, as .dt.year does
+        return values.dt.tz_localize(None).to_numpy()
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values.to_numpy()
+
+    codes, uniques = pd.factorize(values)
+    parsed = None
+    if len(uniques) and all(isinstance(value, str) for value in uniques):
+        for date_format in DATE_FORMATS:
+            attempt = pd.to_datetime(uniques, format=date_format, errors='coerce')
+            if attempt.notna().all():
+                parsed = attempt
+                break
+    if parsed is None:
+        parsed = pd.to_datetime(uniques, errors='coerce')
+    if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+        parsed = parsed.tz_localize(None)
+
+    # Broadcast the distinct dates back to the rows (code -1 is a missing value)
+    return np.append(parsed.to_numpy(), np.datetime64('NaT'))[codes]
+
+
+class AcademicYear:
+    """
+    The AY of a run (start_year, end_year) and its date window. Build it once per run (from_path) and pass it to
+    whatever filters by date.
+    """
+
+    def __init__(self, start_year, end_year):
+        self.start_year = start_year
+        self.end_year = end_year
+
+    @classmethod
+    def from_path(cls, directory_path):
+        match = AY_PATTERN.search(directory_path)
+        if not match:
+            raise ValueError("Academic year (AY_XX_XX) not found in the directory path.")
+        return cls(int(f"20{match.group(1)}"), int(f"20{match.group(2)}"))  # e.g., AY_23_24 -> 2023, 2024
+
+    def __repr__(self):
+        return f"AcademicYear({self.start_year}, {self.end_year})"
+
+    def bounds(self, window='calendar'):
+        """
+        First day of the window and the day after its last day, as datetime64 values.
+        """
+        if window == 'calendar':
+            return np.datetime64(f"{self.start_year}-01-01"), np.datetime64(f"{self.end_year + 1}-01-01")
+        if window == 'fiscal':
+            month = f"{FISCAL_YEAR_START_MONTH:02d}"
+            return np.datetime64(f"{self.start_year}-{month}-01"), np.datetime64(f"{self.end_year}-{month}-01")
+        raise ValueError(f"Unknown date window '{window}'. Use one of: {', '.join(DATE_WINDOWS)}.")
+
+    def date_mask(self, df, column, window='calendar'):
+        """
+        Boolean array of the rows of df whose date in column is inside the window (missing dates are outside).
+        """
+        first_day, day_after = self.bounds(window)
+        dates = parse_dates(df[column])
+        return (dates >= first_day) & (dates < day_after)
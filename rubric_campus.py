@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+# Campus names -> campus codes (HBG / USMGC), in one place for every stage.
+# The extracts spell the campus many ways ('Hattiesburg', 'Gulf Park', 'GCRL', 'Online', 'ONLNE', ...). campus_codes()
+# turns a column into a category column, normalizes and maps each distinct value once (a column of a million rows
+# has a handful of campuses) and broadcasts the result back through the category codes, instead of running
+# .str.strip().str.title() and a dict lookup on every row.
+# The categories are kept in sorted order, so sorting, grouping and pivoting on the column gives the same order as on
+# the plain text column (group with observed=True, so campuses that do not occur are not added as empty groups).
+
+# Faculty Success campus names, after stripping and title-casing, -> campus code (Engagement Part 1)
+CAMPUS_CODES = {
+    'Hattiesburg': 'HBG',
+    'Online': 'HBG',
+    'Gcrl': 'USMGC',
+    'Stennis': 'USMGC',
+    'Mrc': 'USMGC',
+    'Gulf Park': 'USMGC',
+}
+
+# Exact spellings replaced in the Faculty Success extracts by Engagment FC Merge
+FACULTY_SUCCESS_CAMPUS_CODES = {
+    'Hattiesburg': 'HBG',
+    'Gulf Park': 'USMGC',
+    'GCRL': 'USMGC',
+    'Stennis': 'USMGC',
+}
+
+# Online programs count towards Hattiesburg in the student extracts (Pri Prog Camp / Campus)
+ONLINE_CAMPUS_CODES = {'ONLNE': 'HBG'}
+
+# ... and in the JR Graduation Rate data, which spells the campuses out
+ONLINE_CAMPUS_NAMES = {'Online': 'Hattiesburg'}
+
+
+def campus_codes(values, mapping=CAMPUS_CODES, normalize=True):
+    """
+    values (a Series) with every campus replaced by mapping[campus] (campuses not in mapping are kept), as a category
+    column. normalize=True strips and title-cases each value before it is looked up, like
+    values.str.strip().str.title().map(lambda x: mapping.get(x, x)). Missing values stay missing.
+    """
+    categorical = pd.Categorical(values)
+    categories = pd.Series(categorical.categories, dtype=object)
+
+    # Each distinct value is normalized and looked up once
+    if normalize:
+        categories = categories.str.strip().str.title()
+    mapped = categories.map(lambda value: mapping.get(value, value))
+
+    # Names that map to the same code become one category
+    new_categories = pd.Index(mapped.dropna().unique())
+    try:
+        new_categories = new_categories.sort_values()
+    except TypeError:
+        pass
+    category_codes = np.append(new_categories.get_indexer(mapped), -1)  # the extra -1 is for missing values
+    codes = category_codes[categorical.codes]
+
+    result = pd.Categorical.from_codes(codes, categories=new_categories)
+    return pd.Series(result, index=values.index, name=values.name)
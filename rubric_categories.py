@@ -0,0 +1,184 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from rubric_campus import campus_codes
+from rubric_store import as_sheet
+
+# Declarative scoring categories for the Faculty Success extracts (Engagement Part 1).
+# Every category (Applied Research, Creative Works, Presentations, Grants, Awards, IP, Publications) goes through the
+# same steps: read one sheet, add the MASTER_IPEDS_HR columns it needs, turn the campus columns into campus codes, keep
+# the rows that pass its filters and fall in the AY, pivot by HEGIS Code x campus and add a weighted score column.
+# A category is described by a dict, and evaluate_category runs those steps for it:
+#   'name'         label of the extract, also its FACULTY_SUCCESS artifact ('Applied Research')
+#   'pattern'      file pattern in the FACULTY SUCCESS folder ('Applied_Research_AY_*.xlsx')
+#   'sheet'        sheet read from the extract
+#   'prepare'      function(df) -> df run first (columns to drop or recode), optional
+#   'lookup'       (key, [columns]): MASTER_IPEDS_HR columns looked up by the key column (ID or ID_String), optional
+#   'campus'       {column: (mapping, normalize)} campus columns passed through campus_codes
+#   'derive'       function(df) -> df run after the lookup (renames, computed scores), optional
+#   'filters'      [(column, test, value)] with test '==', 'isin' or 'notna'; a row is kept when all of them hold
+#   'dates'        date columns that must fall in the AY (rubric_calendar.AcademicYear.date_mask)
+#   'window'       'calendar' (the date's year is the AY's start or end year, the default) or 'fiscal' (July to June)
+#   'dates_all_or_none'  True when the date window needs every 'dates' column: if one is missing, no date filtering
+#   'optional'     filter / date columns the extract may lack (that filter is then skipped instead of failing)
+#   'index', 'values', 'aggfunc', 'fill_value'   the pivot table
+#   'weight', 'score'   score column added to the pivot: values x weight
+#   'count'        new name for the values column of the pivot, optional
+#   'reset_index'  True when the pivot is kept with plain columns instead of a row index
+#   'artifact', 'sheets'   what is handed on: artifact name and {sheet name: 'pivot', 'data' (every row) or 'filtered'}
+#   'output'       suffix of a new workbook to write the sheets to ('_updated'); by default they go into the extract
+#   'skip_errors'  report a category that cannot be scored (any error) instead of stopping the stage; when only the
+#                  filtering / pivot fails, the 'data' sheets are still written and handed on
+# Adding a category takes one more dict. The categories do not depend on each other, so the stage runs them in a
+# process pool (see process_category in Engagement Part 1).
+
+# Row tests allowed in 'filters'
+FILTER_TESTS = {
+    '==': lambda column, value: column == value,
+    'isin': lambda column, value: column.isin(value),
+    'notna': lambda column, value: column.notna(),
+}
+
+
+def category_mask(df, spec, academic_year):
+    """
+    Boolean array of the rows of df that pass every filter of spec and have every date column in the academic year's
+    window. Filters on an 'optional' column the extract lacks are skipped (and reported); other missing columns raise
+    KeyError.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    optional = spec.get('optional', [])
+
+    for column, test, value in spec.get('filters', []):
+        if column not in df.columns and column in optional:
+            print(f"Column '{column}' not found. Skipping {column} filtering.")
+            continue
+        mask &= FILTER_TESTS[test](df[column], value).to_numpy(dtype=bool)
+
+    date_columns = spec.get('dates', [])
+    missing_dates = [column for column in date_columns if column not in df.columns]
+    if missing_dates and spec.get('dates_all_or_none'):
+        print(f"Date columns {' and '.join(repr(column) for column in date_columns)} not found. Skipping date filtering.")
+        date_columns = []
+
+    for column in date_columns:
+        if column not in df.columns and column in optional:
+            print(f"Date column '{column}' not found. Skipping its date filtering.")
+            continue
+        mask &= academic_year.date_mask(df, column, window=spec.get('window', 'calendar'))
+
+    return mask
+
+
+def category_pivot(df, spec):
+    """
+    The pivot table of spec over df (HEGIS Code x campus), with the weighted score column added.
+    """
+    index = spec['index']
+    values = spec['values']
+    if not all(column in df.columns for column in index + [values]):
+        raise KeyError(f"Missing one or more columns required for the pivot table: {index + [values]}")
+
+    pivot_options = {} if spec.get('fill_value') is None else {'fill_value': spec['fill_value']}
+    pivot_table = pd.pivot_table(
+        df,
+        values=values,
+        index=index,
+        observed=True,  # Campus is a category column: only the combinations that occur
+        aggfunc=spec['aggfunc'],
+        **pivot_options
+    )
+    if spec.get('reset_index'):
+        pivot_table = pivot_table.reset_index()
+
+    # Summed scores are fractional, so they are always kept as floats
+    if spec['aggfunc'] == 'sum':
+        pivot_table[values] = pivot_table[values].astype(float)
+
+    pivot_table[spec['score']] = pivot_table[values] * spec['weight']
+    if spec.get('count'):
+        pivot_table = pivot_table.rename(columns={values: spec['count']})
+    return pivot_table
+
+
+def evaluate_category(spec, df, lookup, academic_year, file_path, write_excel):
+    """
+    Run one category over its extract df (lookup is the HRLookup for spec['lookup'], or None).
+    Returns the sheets to hand on ({sheet name: DataFrame} shaped like read_excel, or None when the category was
+    skipped) and a row for the timing table. When write_excel is set the sheets are also written to the workbook.
+    With 'skip_errors', a category whose filtering or pivot fails still hands on (and writes) its 'data' sheets.
+    """
+    start_time = time.perf_counter()
+    name = spec['name']
+    timing = {'Category': name, 'Rows': len(df), 'Kept': 0, 'Groups': 0, 'Process (s)': 0.0, 'Write (s)': 0.0}
+    data_ready = False
+    filtered = pivot_table = None
+
+    try:
+        if spec.get('prepare'):
+            df = spec['prepare'](df)
+
+        # Add the MASTER_IPEDS_HR columns (one index probe for all of them)
+        if spec.get('lookup'):
+            key, columns = spec['lookup']
+            if key in df.columns:
+                df = lookup.add_columns(df, columns, label=name)
+            else:
+                print(f"Error: '{key}' column missing in the {name} sheet.")
+
+        # Campus names -> campus codes (each distinct name once, as a category column)
+        for column, (mapping, normalize) in spec.get('campus', {}).items():
+            if column in df.columns:
+                df[column] = campus_codes(df[column], mapping, normalize=normalize)
+            else:
+                print(f"Column '{column}' not found. Skipping standardization.")
+
+        if spec.get('derive'):
+            df = spec['derive'](df)
+        data_ready = True
+
+        # Every filter and the date window as one mask, applied once
+        filtered = df[category_mask(df, spec, academic_year)]
+        pivot_table = category_pivot(filtered, spec)
+    except Exception as e:
+        if not spec.get('skip_errors'):
+            raise
+        print(f"{name}: the pivot table could not be created ({type(e).__name__}: {e}).")
+        if not data_ready:
+            timing['Process (s)'] = time.perf_counter() - start_time
+            return None, timing
+        filtered = pivot_table = None
+
+    timing['Kept'] = 0 if filtered is None else len(filtered)
+    timing['Groups'] = 0 if pivot_table is None else len(pivot_table)
+    timing['Process (s)'] = time.perf_counter() - start_time
+
+    frames = {'pivot': pivot_table, 'data': df, 'filtered': filtered}
+    # Only the sheets that were made (just the 'data' sheets when the pivot failed)
+    sheet_frames = {sheet_name: frame for sheet_name, frame in spec['sheets'].items() if frames[frame] is not None}
+    if not sheet_frames:
+        return None, timing
+    with_index = not spec.get('reset_index')
+
+    if write_excel:
+        write_start = time.perf_counter()
+        if spec.get('output'):
+            # A new workbook next to the extract
+            output_path = file_path.replace(".xlsx", f"{spec['output']}.xlsx")
+            writer_options = {'mode': 'w'}
+        else:
+            # Back into the extract, replacing the sheets if they exist
+            output_path = file_path
+            writer_options = {'mode': 'a', 'if_sheet_exists': 'replace'}
+        with pd.ExcelWriter(output_path, engine='openpyxl', **writer_options) as writer:
+            for sheet_name, frame in sheet_frames.items():
+                frames[frame].to_excel(writer, sheet_name=sheet_name, index=with_index and frame == 'pivot')
+        timing['Write (s)'] = time.perf_counter() - write_start
+        print(f"{name}: sheet(s) {', '.join(sheet_frames)} saved to {os.path.basename(output_path)}.")
+
+    sheets = {sheet_name: as_sheet(frames[frame], index=with_index and frame == 'pivot')
+              for sheet_name, frame in sheet_frames.items()}
+    return sheets, timing
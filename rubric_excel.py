@@ -0,0 +1,246 @@
+import glob
+import importlib.util
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# Shared reader for the large source extracts (ET_RAF_COURSE_SCH, ET_RAF_ENROLLMENT, ET_RAF_COMPLETIONS,
+# ET_DELAWARE_STUDY_BASE).
+# pd.read_excel uses the Rust calamine parser when python-calamine is installed, which is several times faster than
+# openpyxl; otherwise it falls back to openpyxl (which pandas already opens read-only).
+# Only the columns a stage actually uses are converted into the DataFrame, and every file reports how fast it was read.
+# read_extracts() reads every file matching a pattern (one per term in multi-term extracts) in a process pool and
+# returns one DataFrame with a Source File column. Set RUBRIC_LOADER_WORKERS to limit the pool (1 = one file at a time);
+# the same limit applies to stages that process several files in their own pool (Delaware).
+# Pools are nested (batch years -> pipeline stages -> loader pools), so every pool is started with worker_pool(), which
+# splits the CPUs of the process starting it between its workers (RUBRIC_CPU_BUDGET): a loader pool inside a stage
+# that already runs next to three other stages on a 4-CPU machine gets one process, not four.
+# The workbooks that carry a row-level detail sheet (DELAWARE_*, INSTRUCTIONAL_EFFORT_PART_1/2, SUCCESS_PART_1/2) are
+# written with open_streaming_workbook() / stream_sheet(): xlsxwriter in constant_memory mode, fed one chunk of rows at a
+# time, so writing them takes the same memory whether the extract has ten thousand rows or a million.
+# A workbook that is saved in several folders is written once; publish() then copies it (or hard-links it, with
+# RUBRIC_PUBLISH=link) to the other folders instead of serializing the same DataFrames again.
+
+# Fastest engine available on this machine
+EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') is not None else 'openpyxl'
+
+# Column added by read_extracts naming the file each row came from
+SOURCE_COLUMN = 'Source File'
+
+# Rows converted from the DataFrame at a time by stream_sheet
+STREAM_CHUNK_ROWS = 10000
+
+# Header style of DataFrame.to_excel, so streamed sheets look the same
+HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+# Environment variable with the number of CPUs a pool worker may keep busy (set by worker_pool)
+CPU_BUDGET_VARIABLE = 'RUBRIC_CPU_BUDGET'
+
+
+def cpu_budget():
+    """
+    Number of CPUs this process may keep busy: its share when it is a worker of a worker_pool, every CPU otherwise.
+    """
+    return int(os.environ.get(CPU_BUDGET_VARIABLE, 0)) or os.cpu_count() or 1
+
+
+# Function run when a worker_pool worker starts: record its share of the CPUs (inherited by the pools it starts)
+def set_cpu_budget(cpus):
+    os.environ[CPU_BUDGET_VARIABLE] = str(cpus)
+
+
+def worker_pool(max_workers=None):
+    """
+    ProcessPoolExecutor with max_workers processes (the CPU budget when None) that split this process's CPU budget:
+    each worker gets cpu_budget() // max_workers CPUs (at least one) for the pools it starts itself.
+    """
+    workers = max_workers or cpu_budget()
+    return ProcessPoolExecutor(max_workers=workers, initializer=set_cpu_budget,
+                               initargs=(max(1, cpu_budget() // workers),))
+
+
+def loader_workers(file_count, workers=None):
+    """
+    Number of processes to use for file_count files: workers, else RUBRIC_LOADER_WORKERS, else the CPU budget of this
+    process (one per CPU outside any pool), but never more than there are files.
+    """
+    if workers is None:
+        workers = int(os.environ.get('RUBRIC_LOADER_WORKERS', 0)) or cpu_budget()
+    return max(1, min(workers, file_count))
+
+
+def read_extract(file_path, columns=None, **read_options):
+    """
+    pd.read_excel with the fastest engine, reading only the given columns (all of them when columns is None).
+    Columns that are missing from the file are simply not returned, so the caller's own column check still applies.
+    read_options are passed on to pd.read_excel (sheet_name, header, skiprows, ...).
+    """
+    if columns is not None:
+        wanted = set(columns)
+        read_options['usecols'] = lambda column: column in wanted
+
+    start_time = time.perf_counter()
+    df = pd.read_excel(file_path, engine=EXCEL_ENGINE, **read_options)
+    seconds = time.perf_counter() - start_time
+
+    rate = len(df) / seconds if seconds > 0 else float('inf')
+    print(f"Read {len(df):,} rows x {len(df.columns)} columns from {os.path.basename(file_path)} "
+          f"in {seconds:.2f} s ({rate:,.0f} rows/s, {EXCEL_ENGINE})")
+    return df
+
+
+# Function run by the loader pool: read one file, or return the error so the other files can still be used
+def read_one_extract(file_path, columns, read_options):
+    try:
+        df = read_extract(file_path, columns, **read_options)
+        missing_columns = [column for column in columns or [] if column not in df.columns]
+        if missing_columns:
+            raise KeyError(f"Missing columns: {missing_columns}")
+        return df, None
+    except Exception as e:
+        return None, e
+
+
+def read_extracts(file_pattern, columns=None, workers=None, **read_options):
+    """
+    Read every file matching file_pattern with read_extract, several at a time in a process pool, and return them as
+    one DataFrame (in file name order) with a Source File column. A file that cannot be read, or lacks one of the
+    columns, is reported and skipped. Returns None when no file could be read.
+    """
+    files = sorted(glob.glob(file_pattern))
+    if not files:
+        return None
+
+    workers = loader_workers(len(files), workers)
+
+    if workers > 1:
+        with worker_pool(workers) as executor:
+            results = list(executor.map(read_one_extract, files, [columns] * len(files), [read_options] * len(files)))
+    else:
+        results = [read_one_extract(file_path, columns, read_options) for file_path in files]
+
+    # Collect the frames and concatenate them once
+    frames = []
+    for file_path, (df, error) in zip(files, results):
+        if error is not None:
+            print(f"Error processing file {file_path}: {error}")
+            continue
+        df[SOURCE_COLUMN] = os.path.basename(file_path)
+        frames.append(df)
+        print(f"Successfully processed file: {file_path}")
+
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+# Stage scripts already imported by this worker process, by path
+_worker_scripts = {}
+
+
+# Function run by map_script_function's pool: import the script (once per process) and call the function
+def call_script_function(script_path, function_name, args):
+    module = _worker_scripts.get(script_path)
+    if module is None:
+        module_name = 'rubric_worker_' + re.sub(r'[^A-Za-z0-9]+', '_', os.path.splitext(os.path.basename(script_path))[0])
+        spec = importlib.util.spec_from_file_location(module_name, script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _worker_scripts[script_path] = module
+    return getattr(module, function_name)(*args)
+
+
+def map_script_function(script_path, function_name, arg_lists, workers):
+    """
+    [function(*args) for args in arg_lists] for a function defined in a stage script, workers calls at a time in a
+    process pool. The scripts are imported by file name (their names contain spaces), so their functions cannot be
+    sent to a pool directly; each worker imports the script itself and looks the function up by name.
+    """
+    arg_lists = list(arg_lists)
+    if workers <= 1:
+        return [call_script_function(script_path, function_name, args) for args in arg_lists]
+    with worker_pool(workers) as executor:
+        return list(executor.map(call_script_function, [script_path] * len(arg_lists),
+                                 [function_name] * len(arg_lists), arg_lists))
+
+
+def open_streaming_workbook(file_path):
+    """
+    xlsxwriter Workbook in constant_memory mode: every row is flushed to a temporary file as soon as the next row is
+    started, so memory does not grow with the number of rows. Rows must therefore be written top to bottom, which
+    stream_sheet does (DataFrame.to_excel writes column by column and cannot be used on this workbook).
+    Use it as a context manager; the file is assembled when it closes.
+    """
+    return xlsxwriter.Workbook(file_path, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+
+
+def stream_sheet(workbook, sheet_name, df, header_format=None, column_formats=None, cell_formats=None,
+                 chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Write df (without its index, like to_excel(index=False)) to a new sheet of a streaming workbook, chunk_rows rows at
+    a time. Missing values are left blank and infinite values are written as 'inf' / '-inf' (as to_excel does). header_format is a format dict for the header row (to_excel's bold,
+    bordered header by default). column_formats maps an Excel column range ('D:D') to (width, Format) and is applied
+    before the rows, since rows already flushed to disk no longer pick up a set_column format. cell_formats maps a
+    column name to one xlsxwriter Format (or None) per row. df must have one header row: MultiIndex columns raise a
+    ValueError.
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        raise ValueError(f"Cannot stream sheet {sheet_name}: its columns are a MultiIndex. Flatten them to one header "
+                         f"row first, e.g. df.columns = [' '.join(map(str, column)).strip() for column in df.columns].")
+
+    worksheet = workbook.add_worksheet(sheet_name)
+    for column_range, (width, column_format) in (column_formats or {}).items():
+        worksheet.set_column(column_range, width, column_format)
+
+    header_style = workbook.add_format(header_format or HEADER_FORMAT)
+    for col_num, value in enumerate(df.columns):
+        worksheet.write(0, col_num, value, header_style)
+
+    # Per-cell formats by column position
+    cell_formats = {df.columns.get_loc(column): list(formats) for column, formats in (cell_formats or {}).items()}
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        # Plain Python values, None where the DataFrame has NaN / NaT / NA
+        values = chunk.astype(object).where(chunk.notna(), None).replace([np.inf, -np.inf], ['inf', '-inf'])
+        for row_num, row in enumerate(values.to_numpy().tolist(), start=start + 1):
+            for col_num, value in enumerate(row):
+                if value is not None:
+                    cell_format = cell_formats[col_num][row_num - 1] if col_num in cell_formats else None
+                    worksheet.write(row_num, col_num, value, cell_format)
+
+    return worksheet
+
+
+def publish(file_path, destinations):
+    """
+    Put the finished workbook at file_path in every other destination without writing it again: a byte copy, or a
+    hard link when the RUBRIC_PUBLISH environment variable is 'link' (no extra disk space; falls back to a copy where
+    the file system does not allow links). An existing file at a destination is removed first, so an old hard link is
+    never written through.
+    """
+    link = os.environ.get('RUBRIC_PUBLISH', 'copy') == 'link'
+    for destination in destinations:
+        if os.path.abspath(destination) == os.path.abspath(file_path):
+            continue
+        if os.path.exists(destination):
+            os.remove(destination)
+
+        if link:
+            try:
+                os.link(file_path, destination)
+                print(f"Linked {file_path} to {destination}")
+                continue
+            except OSError as e:
+                print(f"Could not link {destination} ({e}), copying instead")
+        shutil.copyfile(file_path, destination)
+        print(f"Copied {file_path} to {destination}")
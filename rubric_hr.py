@@ -0,0 +1,132 @@
+import glob
+import os
+import pickle
+
+import pandas as pd
+
+from rubric_cache import CACHE_FOLDER, hash_file
+
+# Shared loader for the MASTER_IPEDS_HR sheet of the *_IPEDS_HR_Component_Survey.xlsx workbook in the AY folder.
+# Instructional FTE, Engagment FC Merge and Engagement Part 1 all need it. The first stage to read it saves it as a
+# pickle under .rubric_cache/hr in the AY folder; every later read (in the same run or the next one) loads the pickle
+# instead of parsing the workbook again, as long as the workbook's content is unchanged.
+# Since every stage can load the master sheet itself, FC Merge no longer embeds a copy of it in each Faculty Success
+# workbook for Engagement Part 1 to read back.
+# HRLookup is a hash index on the master sheet for one key column (ID or ID_String): it adds HR columns such as
+# Location and HEGIS Code to an extract with one index probe instead of a left merge per column, and reports the IDs
+# that are not in the master sheet.
+
+MASTER_SHEET = 'MASTER_IPEDS_HR'
+
+HR_CACHE_FOLDER = os.path.join(CACHE_FOLDER, 'hr')
+
+# Master sheets already loaded by this process, by (path, size, modification time)
+_loaded = {}
+
+
+# Function to find the IPEDS HR workbook in the AY folder (the first match, as the scripts always did)
+def find_hr_file(directory_path, pattern='*_IPEDS_HR_Component_Survey*.xlsx'):
+    file_pattern = os.path.join(directory_path, pattern)
+    files = glob.glob(file_pattern)
+    if not files:
+        raise FileNotFoundError(f"No IPEDS HR files found matching pattern: {file_pattern}")
+    return files[0]
+
+
+def read_hr_master(file_path):
+    """
+    The MASTER_IPEDS_HR sheet of file_path, as pd.read_excel returns it. Loaded from the binary cache next to the
+    workbook when the workbook is unchanged since it was cached, otherwise read from the workbook and cached.
+    Hands out a copy, so callers can modify it freely.
+    """
+    status = os.stat(file_path)
+    memory_key = (os.path.abspath(file_path), status.st_size, status.st_mtime_ns)
+    if memory_key in _loaded:
+        return _loaded[memory_key].copy()
+
+    cache_folder = os.path.join(os.path.dirname(os.path.abspath(file_path)), HR_CACHE_FOLDER)
+    cache_path = os.path.join(cache_folder, os.path.splitext(os.path.basename(file_path))[0] + '.pkl')
+    source_hash = hash_file(file_path)
+
+    master_df = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as file:
+                cached = pickle.load(file)
+            if cached['source_hash'] == source_hash and cached['pandas'] == pd.__version__:
+                master_df = cached['table']
+                print(f"Loaded {MASTER_SHEET} from the cache ({len(master_df):,} rows)")
+        except Exception as e:
+            print(f"Could not read the cached {MASTER_SHEET} sheet: {e}")
+
+    if master_df is None:
+        master_df = pd.read_excel(file_path, sheet_name=MASTER_SHEET)
+        print(f"Read {MASTER_SHEET} from {os.path.basename(file_path)} ({len(master_df):,} rows); caching it")
+        if not os.path.exists(cache_folder):
+            os.makedirs(cache_folder, exist_ok=True)
+        # Written under a temporary name first, so a stage reading at the same time never sees half a file
+        temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            pickle.dump({'source_hash': source_hash, 'pandas': pd.__version__, 'table': master_df}, file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+
+    _loaded[memory_key] = master_df
+    return master_df.copy()
+
+
+def with_id_string(master_df):
+    """
+    The master sheet with the ID_String column (the ID as text) that the Faculty Success extracts are matched on.
+    """
+    master_df = master_df.copy()
+    master_df['ID_String'] = master_df['ID'].astype(str)
+    return master_df
+
+
+class HRLookup:
+    """
+    Hash index on the master sheet by key (built once, reused for every extract). add_columns gives the same result as
+    df.merge(master_df[[key] + columns], left_on=on, right_on=key, how='left') (columns already in df get the _x / _y
+    suffixes, as with merge), except that an ID listed more than once in the master sheet uses its first row instead
+    of repeating the extract's rows.
+    """
+
+    def __init__(self, master_df, key):
+        self.key = key
+        keys = master_df[key]
+        duplicated = keys.duplicated(keep='first') & keys.notna()
+        if duplicated.any():
+            print(f"{MASTER_SHEET} lists {duplicated.sum()} {key} value(s) more than once; the first row of each is used.")
+        self.table = master_df[~duplicated & keys.notna()].reset_index(drop=True)
+        self.index = pd.Index(self.table[key])
+        self.unmatched = {}  # label -> IDs of the last add_columns call that were not found
+
+    def add_columns(self, df, columns, on=None, label=None):
+        """
+        df with the given master columns added, matched on df[on] (the key column by default).
+        IDs that are not in the master sheet get NaN and are reported (and kept in self.unmatched[label]).
+        """
+        on = on or self.key
+        positions = self.index.get_indexer(df[on])
+
+        missing = positions == -1
+        if missing.any():
+            label = label or on
+            ids = df[on][missing]
+            self.unmatched[label] = ids.dropna().unique().tolist()
+            examples = ', '.join(str(value) for value in self.unmatched[label][:10])
+            print(f"{label}: {missing.sum()} of {len(df)} rows with a {on} not found in {MASTER_SHEET} "
+                  f"({len(self.unmatched[label])} distinct{': ' + examples if examples else ''}"
+                  f"{', ...' if len(self.unmatched[label]) > 10 else ''}).")
+
+        df = df.copy()
+        for column in columns:
+            values = self.table[column].array.take(positions, allow_fill=True)
+            name = column
+            if column in df.columns and column != on:
+                # Same names merge would give to the two copies
+                df = df.rename(columns={column: column + '_x'})
+                name = column + '_y'
+            df[name] = pd.Series(values, index=df.index)
+        return df
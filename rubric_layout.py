@@ -0,0 +1,30 @@
+import os
+
+# The folder layout under an AY_**_** folder, shared by rubric_pipeline.py / rubric.py and the stage scripts.
+# rubric.toml ([folders]) can rename the folders; the runner passes the resulting layout to every stage
+# (run(directory_path, store=None, layout=None)), and the scripts use it for every folder they read from or write to
+# outside their own base directory. A script run on its own uses the standard names.
+
+# Folders under the AY root, by the name used in rubric_pipeline.STAGES / STAGE_INPUTS and in rubric.toml
+FOLDERS = {
+    'instructional_effort_part_1': 'INSTRUCTIONAL EFFORT PART 1',
+    'instructional_effort_part_2': 'INSTRUCTIONAL EFFORT PART 2',
+    'success': 'SUCCESS',
+    'faculty_success': 'FACULTY SUCCESS',
+    'output': 'OUTPUT',
+}
+
+
+# Function to combine the standard folder names with the ones given in rubric.toml
+def folder_layout(folders=None):
+    layout = dict(FOLDERS)
+    for name, folder in (folders or {}).items():
+        if name not in FOLDERS:
+            raise ValueError(f"Unknown folder '{name}'. Known folders: {', '.join(FOLDERS)}.")
+        layout[name] = folder
+    return layout
+
+
+# Function to get a folder of the layout under the AY root (the standard layout when layout is None)
+def layout_folder(ay_root, name, layout=None):
+    return os.path.join(ay_root, (layout or FOLDERS)[name])
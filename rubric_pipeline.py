@@ -0,0 +1,281 @@
+import argparse
+import importlib.util
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from rubric_cache import CACHE_FOLDER, BuildCache, hash_file, input_files, stage_key
+from rubric_excel import worker_pool
+from rubric_layout import FOLDERS, folder_layout
+from rubric_store import ArtifactStore, ParquetArtifactStore
+
+# Runs every rubric stage for one AY folder in a single command.
+# Each stage script exposes run(directory_path, store=None, layout=None). The runner hands every stage an ArtifactStore,
+# so the DataFrames one stage produces are used directly by the next one instead of being written to .xlsx and
+# parsed again with pd.read_excel. Only FINAL_OUTPUT.xlsx is written, unless write_intermediates=True.
+# The stages form a graph: Delaware feeds Instructional FTE, which fans out to the Instructional Effort, Success and
+# Engagement branches, and everything joins at FINAL OUTPUT. Stages whose inputs are ready run at the same time in a
+# process pool, so a full rebuild uses every core (one stage per CPU of this process's budget by default; the CPUs are
+# split between the stages, so the loader pools inside them do not start a process per CPU each).
+# Stages whose script, source extracts and upstream stages are unchanged since the last run are not run again; their
+# results are reused from the build cache (see rubric_cache.py). --no-cache runs everything.
+# --intermediate-format parquet hands the intermediates over as Parquet files under .rubric_cache/intermediates
+# instead of pickling DataFrames between processes; the downstream stages memory-map them.
+# The scripts can still be run one at a time exactly as before (they prompt for their folder and write every workbook).
+# For unattended runs use rubric.py (python rubric.py run --ay AY_23_24 --root ...), which also reads the folder layout
+# and run options from rubric.toml.
+# C:\...\...\The University of Southern Mississippi\...\W Drive\Userfiles\AKale\Resource Allocation Rubric\AY_**_**
+
+# Directory that holds the stage scripts (this file sits next to them)
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Folders under the AY root come from rubric_layout.FOLDERS (renamed through rubric.toml [folders]); every stage is run
+# with the layout, so it reads and writes the renamed folders.
+# (stage name, script file, folder (FOLDERS name, None = the AY root) the script expects as its base directory,
+#  stages it needs first)
+STAGES = [
+    ('Delaware', 'Delaware.py', None, []),
+    ('Instructional FTE', 'Instructional FTE.py', None, ['Delaware']),
+    ('Instructional Effort part 1', 'Instructional Effort part 1.py', 'instructional_effort_part_1', ['Instructional FTE']),
+    ('Instructional Effort part 2', 'Instructional Effort part 2.py', 'instructional_effort_part_2', ['Instructional FTE']),
+    ('Success part 1', 'Success part 1.py', 'success', ['Instructional FTE']),
+    ('Success part 2', 'Success part 2.py', 'success', []),
+    ('Engagment FC Merge', 'Engagment FC Merge.py', 'faculty_success', []),
+    ('Engagement Part 1', 'Engagement Part 1.py', 'faculty_success', ['Engagment FC Merge']),
+    ('Engagement Part 2', 'Engagement Part 2.py', 'faculty_success', ['Engagment FC Merge']),
+    ('Engagement 1.1', 'Engagement 1.1.py', 'faculty_success', ['Instructional FTE', 'Engagement Part 1']),
+    ('FINAL OUTPUT', 'FINAL OUTPUT.py', 'output', [
+        'Instructional FTE', 'Instructional Effort part 1', 'Instructional Effort part 2',
+        'Success part 1', 'Success part 2', 'Engagement Part 2', 'Engagement 1.1',
+    ]),
+]
+
+# Source files each stage reads from disk, relative to the AY root (the build cache hashes these).
+# {name} stands for a folder in FOLDERS. Everything else a stage needs comes from the stages it depends on.
+STAGE_INPUTS = {
+    'Delaware': ['ET_DELAWARE_STUDY_BASE*.xlsx'],
+    'Instructional FTE': ['*_IPEDS_HR_Component_Survey.xlsx'],
+    'Instructional Effort part 1': ['{instructional_effort_part_1}/ET_RAF_COURSE_SCH_*.xlsx'],
+    'Instructional Effort part 2': ['{instructional_effort_part_2}/ET_RAF_ENROLLMENT_*.xlsx'],
+    'Success part 1': ['{success}/ET_RAF_COMPLETIONS_*.xlsx'],
+    'Success part 2': ['{success}/JR Graduation Rate_Full Data_data.csv', '{success}/ET_RAF_COMPLETIONS_*.xlsx'],
+    'Engagment FC Merge': [
+        '{faculty_success}/Applied_Research_AY_*', '{faculty_success}/Awards_AY_*', '{faculty_success}/Creative_Works_AY_*',
+        '{faculty_success}/High_Impact_Practices_Directed_Service_Learning_AY_*',
+        '{faculty_success}/High_Impact_Practices_Scheduled_Learning_AY_*', '{faculty_success}/Presentations_AY_*',
+        '{faculty_success}/IP_AY_*', '{faculty_success}/Grants_AY_*', '{faculty_success}/Publications*.xlsx',
+        'Fall_*_IPEDS_HR_Component_Survey*.xlsx',
+    ],
+    'Engagement Part 1': ['{faculty_success}/Grants_AY_*.xlsx'],
+}
+
+# Files a stage writes even when the intermediates are kept in memory (a cached stage is re-run if they are gone)
+STAGE_OUTPUTS = {
+    'FINAL OUTPUT': ['{output}/FINAL_OUTPUT.xlsx'],
+}
+
+
+# How the intermediates are handed from stage to stage
+INTERMEDIATE_FORMATS = ['memory', 'parquet']
+
+# Folder (under the AY root) for the Parquet intermediates
+INTERMEDIATE_FOLDER = os.path.join(CACHE_FOLDER, 'intermediates')
+
+
+# Function to import a stage script by file name (the names contain spaces, so a plain import does not work)
+def load_stage(script_name):
+    script_path = os.path.join(SCRIPT_DIRECTORY, script_name)
+    module_name = 'rubric_stage_' + os.path.splitext(script_name)[0].replace(' ', '_').replace('.', '_')
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Function to get the base directory a stage expects
+def stage_directory(root, folder, layout=FOLDERS):
+    return os.path.join(root, layout[folder]) if folder else root
+
+
+# Function to fill the folder names into a stage's file patterns
+def stage_patterns(patterns, layout=FOLDERS):
+    return [pattern.format(**layout) for pattern in patterns]
+
+
+# Function to list every stage a stage depends on, directly or through other stages
+def upstream_stages(stage_name):
+    dependencies = {name: needs for name, _, _, needs in STAGES}
+    seen = set()
+    pending = list(dependencies[stage_name])
+    while pending:
+        name = pending.pop()
+        if name not in seen:
+            seen.add(name)
+            pending.extend(dependencies[name])
+    return seen
+
+
+# Function to check the stage graph before running it (unknown names or cycles would make the scheduler stall)
+def validate_stages():
+    names = [name for name, _, _, _ in STAGES]
+    for position, (name, _, _, needs) in enumerate(STAGES):
+        for need in needs:
+            if need not in names:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{need}'.")
+            # Listing the stages in dependency order lets the cache keys be worked out in one pass
+            if names.index(need) > position:
+                raise ValueError(f"Stage '{name}' is listed before the stage it depends on ('{need}').")
+
+
+# Function run by the pool workers: runs one stage with the artifacts it needs and returns the ones it produced
+def run_stage(script_name, directory_path, write_excel, artifacts, intermediate_folder=None, layout=None):
+    start_time = time.perf_counter()
+    if intermediate_folder:
+        store = ParquetArtifactStore(intermediate_folder, write_excel=write_excel)
+    else:
+        store = ArtifactStore(write_excel=write_excel)
+    store.artifacts = dict(artifacts)
+
+    stage = load_stage(script_name)
+    stage.run(directory_path, store=store, layout=layout)
+
+    produced = {name: sheets for name, sheets in store.artifacts.items() if name not in artifacts}
+    return produced, time.perf_counter() - start_time
+
+
+def run_pipeline(root, write_intermediates=False, workers=None, use_cache=True, intermediate_format='memory',
+                 folders=None):
+    root = os.path.normpath(root)
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"The directory '{root}' does not exist. Please check the path and try again.")
+    if intermediate_format not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"Unknown intermediate format '{intermediate_format}'. Choose one of: {', '.join(INTERMEDIATE_FORMATS)}.")
+    if intermediate_format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("--intermediate-format parquet needs pyarrow. Install it with: pip install pyarrow")
+
+    validate_stages()
+    layout = folder_layout(folders)
+
+    # The OUTPUT folder always receives FINAL_OUTPUT.xlsx
+    output_folder = os.path.join(root, layout['output'])
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+        print(f"Created directory: {output_folder}")
+
+    if intermediate_format == 'parquet':
+        intermediate_folder = os.path.join(root, INTERMEDIATE_FOLDER)
+        store = ParquetArtifactStore(intermediate_folder, write_excel=write_intermediates)
+    else:
+        intermediate_folder = None
+        store = ArtifactStore(write_excel=write_intermediates)
+    produced_by = {}  # stage name -> names of the artifacts it produced
+    timings = {}
+    pipeline_start = time.perf_counter()
+
+    # The cache is skipped when the per-stage workbooks are wanted, since a cached stage would not write them
+    cache = BuildCache(root) if use_cache and not write_intermediates else None
+    keys = {}
+    input_hashes = {}
+    if cache is not None:
+        for stage_name, script_name, _, needs in STAGES:
+            input_hashes[stage_name] = {relative_path: hash_file(os.path.join(root, relative_path))
+                                        for relative_path in input_files(root, stage_patterns(STAGE_INPUTS.get(stage_name, []), layout))}
+            keys[stage_name] = stage_key(os.path.join(SCRIPT_DIRECTORY, script_name), root, input_hashes[stage_name],
+                                         [keys[need] for need in needs], variant=intermediate_format)
+
+    # Function to collect the artifacts of every stage a stage depends on
+    def upstream_artifacts(stage_name):
+        names = [name for upstream in upstream_stages(stage_name) for name in produced_by[upstream]]
+        return {name: store.artifacts[name] for name in names}
+
+    # Function to record a finished stage (and save it to the cache when it was actually run)
+    def finish_stage(stage_name, produced, seconds, from_cache=False):
+        store.artifacts.update(produced)
+        produced_by[stage_name] = list(produced)
+        timings[stage_name] = None if from_cache else seconds
+        if from_cache:
+            print(f"=== {stage_name} unchanged, reused from cache ===")
+            return
+        print(f"=== {stage_name} finished in {seconds:.2f} s ===")
+        if cache is not None:
+            # In parquet mode the artifacts are file paths, so the files themselves are part of the cached result
+            output_files = [os.path.relpath(file_path, root).replace(os.sep, '/')
+                            for sheets in produced.values() for file_path in sheets.values()] if intermediate_folder else []
+            cache.record(stage_name, keys[stage_name], input_hashes[stage_name], produced,
+                         stage_patterns(STAGE_OUTPUTS.get(stage_name, []), layout) + output_files)
+
+    # Reuse every stage whose key matches the last build
+    if cache is not None:
+        for stage_name, _, _, _ in STAGES:
+            cached = cache.lookup(stage_name, keys[stage_name], stage_patterns(STAGE_OUTPUTS.get(stage_name, []), layout))
+            if cached is not None:
+                finish_stage(stage_name, cached, 0.0, from_cache=True)
+
+    if workers == 1:
+        # Run the stages one after another in this process (same order as the list above)
+        for stage_name, script_name, subdirectory, _ in STAGES:
+            if stage_name in produced_by:
+                continue
+            print(f"\n=== {stage_name} ===")
+            produced, seconds = run_stage(script_name, stage_directory(root, subdirectory, layout), write_intermediates,
+                                         upstream_artifacts(stage_name), intermediate_folder, layout)
+            finish_stage(stage_name, produced, seconds)
+    else:
+        # Submit every stage whose dependencies are done, then wait for the next one to finish
+        remaining = {name: (script_name, subdirectory, needs) for name, script_name, subdirectory, needs in STAGES
+                     if name not in produced_by}
+        running = {}
+
+        with worker_pool(workers) if remaining else nullcontext() as executor:
+            while remaining or running:
+                for stage_name in [name for name, (_, _, needs) in remaining.items() if all(need in produced_by for need in needs)]:
+                    script_name, subdirectory, _ = remaining.pop(stage_name)
+                    print(f"\n=== {stage_name} started ===")
+                    future = executor.submit(run_stage, script_name, stage_directory(root, subdirectory, layout), write_intermediates,
+                                             upstream_artifacts(stage_name), intermediate_folder, layout)
+                    running[future] = stage_name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage_name = running.pop(future)
+                    try:
+                        produced, seconds = future.result()
+                    except Exception:
+                        print(f"=== {stage_name} failed ===")
+                        for pending in running:
+                            pending.cancel()
+                        raise
+                    finish_stage(stage_name, produced, seconds)
+
+    print("\nStage timings:")
+    for stage_name, _, _, _ in STAGES:
+        if timings[stage_name] is None:
+            print(f"  {stage_name:<30} {'cached':>8}")
+        else:
+            print(f"  {stage_name:<30} {timings[stage_name]:8.2f} s")
+    print(f"  {'Wall clock':<30} {time.perf_counter() - pipeline_start:8.2f} s")
+
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every rubric stage for one AY folder.")
+    parser.add_argument('root', nargs='?', help="AY_**_** folder (prompted for when left out)")
+    parser.add_argument('--write-intermediates', action='store_true', help="also write every per-stage workbook")
+    parser.add_argument('--workers', type=int, default=None, help="number of stages to run at once (1 = one after another)")
+    parser.add_argument('--no-cache', action='store_true', help="run every stage even if its inputs are unchanged")
+    parser.add_argument('--intermediate-format', choices=INTERMEDIATE_FORMATS, default='memory',
+                        help="how stages hand their results on: in memory or as Parquet files (needs pyarrow)")
+    parser.add_argument('--loader-workers', type=int, default=None,
+                        help="processes used to read multi-file extracts within a stage (1 = one file at a time)")
+    args = parser.parse_args()
+
+    # The stage processes inherit the environment, so this reaches rubric_excel.read_extracts in every stage
+    if args.loader_workers:
+        os.environ['RUBRIC_LOADER_WORKERS'] = str(args.loader_workers)
+
+    # Base directory is the AY_**_** folder
+    directory_path = args.root or input("Enter the base directory path: ")
+    run_pipeline(directory_path, write_intermediates=args.write_intermediates, workers=args.workers, use_cache=not args.no_cache,
+                 intermediate_format=args.intermediate_format)
@@ -0,0 +1,19 @@
+# Vectorized versions of the row-by-row score calculations (DataFrame.apply(..., axis=1)) used in the rubric scripts.
+# Each function works on whole columns at once and gives the same values as the lambda it replaces
+# (the lambda is quoted in each docstring).
+
+
+def total_or_value(df, campus_column, total_campus, total_column, value_column):
+    """
+    The total on the TOTAL row of each HEGIS Code, the row's own value on the campus rows:
+    df.apply(lambda row: row[total_column] if row[campus_column] == total_campus else row[value_column], axis=1)
+    """
+    return df[value_column].where(df[campus_column] != total_campus, df[total_column])
+
+
+def ratio_where_positive(numerator, denominator, fill=0):
+    """
+    numerator / denominator where the denominator is above zero, fill everywhere else (including a missing denominator):
+    df.apply(lambda row: row[numerator] / row[denominator] if row[denominator] > 0 else fill, axis=1)
+    """
+    return (numerator / denominator).where(denominator > 0, fill)
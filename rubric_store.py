@@ -0,0 +1,193 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# In-memory hand-off between the rubric stages.
+# When the stages run one script at a time, every stage writes its workbooks to disk and the next stage
+# reads them back with pd.read_excel. When they run through rubric_pipeline.py, each stage puts the sheets
+# it produces into an ArtifactStore instead, and the next stage takes them straight from memory.
+# Artifacts are keyed by a short name (e.g. 'INSTRUCTIONAL_FTE') and hold one DataFrame per sheet name,
+# shaped the way pd.read_excel would have returned that sheet.
+# ParquetArtifactStore keeps the same interface but writes every sheet to a Parquet file and reads it back
+# memory-mapped, so the hand-off also works between processes and stays on disk for inspection.
+# ResultsStore is the same hand-off for the Faculty Success scripts run one at a time with read-only inputs: every
+# artifact is saved as its own workbook in FACULTY SUCCESS/RESULTS instead of being appended to the input extracts.
+
+
+# Folder (inside the Faculty Success folder) holding the ResultsStore of standalone read-only runs
+RESULTS_FOLDER = 'RESULTS'
+
+
+class ArtifactStore:
+    """
+    Holds the sheets produced by each stage so downstream stages can use them without an Excel round-trip.
+    write_excel=True keeps writing the per-stage workbooks as well (useful for checking intermediates).
+    """
+
+    def __init__(self, write_excel=False):
+        self.write_excel = write_excel
+        self.artifacts = {}
+
+    def put(self, name, sheets):
+        # Store a copy of every sheet so later in-place edits in the producing stage do not leak through
+        self.artifacts[name] = {sheet_name: df.copy() for sheet_name, df in sheets.items()}
+
+    def has(self, name, sheet_name=None):
+        if name not in self.artifacts:
+            return False
+        return sheet_name is None or sheet_name in self.artifacts[name]
+
+    def get(self, name, sheet_name):
+        # Hand out a copy so the consuming stage can modify it freely
+        return self.artifacts[name][sheet_name].copy()
+
+    def names(self):
+        return list(self.artifacts)
+
+    def find(self, prefix):
+        # Equivalent of glob('PREFIX*.xlsx')[0]: the first artifact whose name starts with prefix, or None
+        matches = [name for name in self.artifacts if name.startswith(prefix)]
+        return matches[0] if matches else None
+
+
+class ParquetArtifactStore(ArtifactStore):
+    """
+    ArtifactStore that holds file paths instead of DataFrames: put() writes each sheet under folder
+    (<artifact>/<sheet>.parquet) and get() reads it back. Needs pyarrow.
+    """
+
+    def __init__(self, folder, write_excel=False):
+        super().__init__(write_excel)
+        self.folder = folder
+
+    def put(self, name, sheets):
+        artifact_folder = os.path.join(self.folder, file_slug(name))
+        if not os.path.exists(artifact_folder):
+            os.makedirs(artifact_folder)
+        self.artifacts[name] = {sheet_name: write_sheet(df, os.path.join(artifact_folder, file_slug(sheet_name)))
+                                for sheet_name, df in sheets.items()}
+
+    def get(self, name, sheet_name):
+        return read_sheet(self.artifacts[name][sheet_name])
+
+
+class ResultsStore(ArtifactStore):
+    """
+    ArtifactStore for standalone runs that leave the input extracts untouched (RUBRIC_READ_ONLY_INPUTS=1): put() also
+    saves every artifact as one workbook in folder (<artifact>.xlsx, one sheet per sheet name), and has() / get() find
+    the artifacts saved by the scripts run before, so the next script reads them from there instead of from sheets
+    appended to the extracts. The scripts still write their own output workbooks (FS_A, HIP_B).
+    names() and find() only list the artifacts put by the running script.
+    """
+
+    def __init__(self, folder):
+        super().__init__(write_excel=True)
+        self.folder = folder
+
+    def artifact_path(self, name):
+        return os.path.join(self.folder, file_slug(name) + '.xlsx')
+
+    def put(self, name, sheets):
+        super().put(name, sheets)
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        with pd.ExcelWriter(self.artifact_path(name), engine='xlsxwriter') as writer:
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    def has(self, name, sheet_name=None):
+        if super().has(name, sheet_name):
+            return True
+        artifact_path = self.artifact_path(name)
+        if not os.path.exists(artifact_path):
+            return False
+        if sheet_name is None:
+            return True
+        with pd.ExcelFile(artifact_path) as workbook:
+            return sheet_name in workbook.sheet_names
+
+    def get(self, name, sheet_name):
+        if super().has(name, sheet_name):
+            return super().get(name, sheet_name)
+        return pd.read_excel(self.artifact_path(name), sheet_name=sheet_name)
+
+
+# Function to turn an artifact or sheet name into a safe file name
+def file_slug(name):
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')
+
+
+# Function to save one sheet for ParquetArtifactStore and return the path it was saved to
+def write_sheet(df, path_stem):
+    # Parquet needs text column names and one type per column; a sheet that does not fit is pickled instead
+    if all(isinstance(column, str) for column in df.columns):
+        try:
+            df.to_parquet(path_stem + '.parquet')
+            return path_stem + '.parquet'
+        except (ValueError, TypeError) as e:
+            print(f"Sheet {os.path.basename(path_stem)} cannot be stored as Parquet ({e}); pickling it instead.")
+    df.to_pickle(path_stem + '.pkl')
+    return path_stem + '.pkl'
+
+
+# Function to load a sheet saved by write_sheet (Parquet files are memory-mapped rather than read into a buffer)
+def read_sheet(file_path):
+    if file_path.endswith('.parquet'):
+        return pd.read_parquet(file_path, memory_map=True)
+    return pd.read_pickle(file_path)
+
+
+def should_write_excel(store):
+    # Standalone runs (no store) always write their workbooks; pipeline runs only when asked to
+    return store is None or store.write_excel
+
+
+def read_only_inputs():
+    # RUBRIC_READ_ONLY_INPUTS=1 (rubric.py --read-only-inputs): nothing is ever written into the input extracts
+    return os.environ.get('RUBRIC_READ_ONLY_INPUTS', '0') not in ('', '0')
+
+
+def should_write_extracts(store):
+    # Pivots and updated sheets are written back into the input extracts only when the stage writes its workbooks
+    # and the inputs are not read-only
+    return should_write_excel(store) and not read_only_inputs()
+
+
+def stage_store(directory_path, store):
+    # The store a Faculty Success script hands its results on with: the pipeline's store, or for a standalone
+    # read-only run the ResultsStore in directory_path/RESULTS (None for a standalone run that writes the extracts)
+    if store is None and read_only_inputs():
+        return ResultsStore(os.path.join(directory_path, RESULTS_FOLDER))
+    return store
+
+
+def as_sheet(df, index=False):
+    """
+    Return df shaped the way pd.read_excel returns it after df.to_excel(..., index=index):
+    the index becomes ordinary columns, category columns become plain columns, empty strings come back as NaN and
+    text columns that only hold numbers (e.g. ID_String) come back as numbers.
+    """
+    if index:
+        df = df.rename_axis(columns=None).reset_index()
+    else:
+        df = df.copy()
+
+    # Category columns (e.g. the campus codes from rubric_campus) come back as plain values
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    df = df.replace('', np.nan)
+
+    # read_excel parses every text column again, so numeric-looking strings are converted back to numbers
+    for column in df.columns:
+        values = df[column]
+        if not (pd.api.types.is_object_dtype(values.dtype) or isinstance(values.dtype, pd.StringDtype)):
+            continue
+        if values.notna().any() and values.dropna().map(lambda value: isinstance(value, str)).all():
+            try:
+                df[column] = pd.to_numeric(values)
+            except (ValueError, TypeError):
+                pass
+    return df
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# Per-HEGIS-Code campus and TOTAL rows, built in one pass over the table instead of a loop over the HEGIS Codes.
+# Engagement Part 2 (HIP), Instructional Effort part 2 and Success part 1 / part 2 all add a total row for every
+# HEGIS Code, and Engagement Part 2 also gives every HEGIS Code an HBG and a USMGC row. Looping over
+# df['HEGIS Code'].unique() filters the whole table once per code (codes x rows); here:
+#   campus_rows    the full HEGIS Code x campus index is built once and the table is reindexed on it (zero rows
+#                  for the missing campuses)
+#   total_rows     one groupby over the table
+#   append_totals  puts each total row after the rows of its HEGIS Code with one sort
+# Key values come out in order of first appearance, as the loops produced them.
+
+# Campuses every HEGIS Code gets a row for
+SCORED_CAMPUSES = ['HBG', 'USMGC']
+
+
+def _key_values(df, key):
+    # key is a column of df or a level of its index
+    if key in df.columns:
+        return df[key]
+    return pd.Series(df.index.get_level_values(key), index=df.index)
+
+
+def campus_rows(df, key, campus_column, columns, campuses=SCORED_CAMPUSES):
+    """
+    For every key value of df (in order of first appearance), its row for each of campuses in that order, with zeros
+    in columns where it has no row for a campus. Rows of other campuses are left out. A key value with several rows
+    for one campus raises a ValueError (add them up first).
+    """
+    keys = pd.unique(df[key].dropna())
+    full_index = pd.MultiIndex.from_product([keys, campuses], names=[key, campus_column])
+    rows = df.set_index([key, campus_column])[columns]
+    rows = rows[rows.index.isin(full_index)]
+    if rows.index.has_duplicates:
+        duplicates = rows.index[rows.index.duplicated()].unique()
+        raise ValueError(f"Several rows for the same {key} and {campus_column}: "
+                         f"{', '.join(f'{value} / {campus}' for value, campus in duplicates)}. Add them up first.")
+    return rows.reindex(full_index, fill_value=0).reset_index()
+
+
+def total_rows(df, key, aggregations, labels=None):
+    """
+    One row per key value of df (in order of first appearance) with the columns of aggregations ({column: 'sum',
+    'first', 'mean', ...}) aggregated over its rows and the columns of labels ({column: value}) set to a fixed value,
+    in the column order of df.
+    """
+    totals = df.groupby(key, sort=False)[list(aggregations)].agg(aggregations).reset_index()
+    for column, value in (labels or {}).items():
+        totals[column] = value
+    return totals[[column for column in df.columns if column in totals.columns]]
+
+
+def append_totals(rows, totals, key):
+    """
+    rows and totals combined, each total row right after the rows with its key value (key values in order of first
+    appearance, rows in their original order). key is a column or an index level of both frames; the index is kept.
+    """
+    result = pd.concat([rows, totals])
+    key_values = _key_values(result, key)
+    key_position = pd.Index(pd.unique(key_values)).get_indexer(key_values)
+    is_total_row = np.r_[np.zeros(len(rows)), np.ones(len(totals))]
+    return result.iloc[np.lexsort((is_total_row, key_position))]
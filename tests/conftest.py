@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts and rubric_* helpers live in the repository root (there is no package to install)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
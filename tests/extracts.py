@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+
+# Small source extracts shared by the tests and by make_goldens.py, so the goldens (captured from the baseline
+# scripts) and the tests (running the current scripts) read the same files.
+
+# ET_RAF_COURSE_SCH rows (ID, SCH Load, WithinDisc(1)/InterDisc(1.5), HEGIS Code, Campus): A has 10 SCH at HBG and
+# 4 x 1.5 = 6 at USMGC, B has 5 at HBG and 3 at USMGC, C has no Grand Total
+COURSE_ROWS = [
+    (1, 10, 1.0, 'A', 'HBG'),
+    (2, 4, 1.5, 'A', 'USMGC'),
+    (3, 5, 1.0, 'B', 'HBG'),
+    (4, 3, 1.0, 'B', 'USMGC'),
+    (5, 7, 1.0, 'C', 'HBG'),
+]
+
+# ET_RAF_ENROLLMENT rows (ID, HEGIS Code, Pri Prog Camp): ONLNE counts as HBG, D has a Grand Total of 0 and C has none
+ENROLLMENT_ROWS = [
+    (1, 'A', 'HBG'),
+    (2, 'A', 'ONLNE'),
+    (3, 'A', 'GC'),
+    (4, 'B', 'HBG'),
+    (5, 'B', 'GC'),
+    (6, 'C', 'GC'),
+    (7, 'D', 'HBG'),
+]
+
+# Grand Total (FTE) of each HEGIS Code in the INSTRUCTIONAL_FTE pivot
+GRAND_TOTALS = {'A': 2.0, 'B': 4.0, 'D': 0.0}
+
+
+# Function to write an extract with the title row the ET_RAF extracts have above their header
+def write_extract(file_path, rows):
+    with pd.ExcelWriter(file_path) as writer:
+        pd.DataFrame([[os.path.splitext(os.path.basename(file_path))[0]]]).to_excel(writer, index=False, header=False)
+        rows.to_excel(writer, index=False, startrow=1)
+
+
+def grand_total_pivot(grand_totals=GRAND_TOTALS):
+    return pd.DataFrame({'HEGIS Code': list(grand_totals), 'Grand Total': list(grand_totals.values())})
+
+
+# Function to write INSTRUCTIONAL_FTE_4241.xlsx, as Instructional FTE saves it next to both Instructional Effort parts
+def write_grand_totals(directory_path, grand_totals=GRAND_TOTALS):
+    grand_total_pivot(grand_totals).to_excel(os.path.join(directory_path, 'INSTRUCTIONAL_FTE_4241.xlsx'),
+                                             sheet_name='Pivot Table NEW CALC FTE', index=False)
+
+
+def write_course_extract(directory_path):
+    write_extract(os.path.join(directory_path, 'ET_RAF_COURSE_SCH_2023.xlsx'), pd.DataFrame([{
+        'ID': row_id, 'SCH Load': sch, 'WithinDisc(1)/InterDisc(1.5)': factor,
+        'Instr HEGIS Code': code, 'Instr HEGIS Descr': f'{code} descr',
+        'Instr School': 'School', 'Instr College': 'College',
+        'Instr HEGIS AS OF Term': 'Fall', 'Class HEGIS Code': code,
+        'Campus': campus, 'Class Nbr': 100 + row_id,
+    } for row_id, sch, factor, code, campus in COURSE_ROWS]))
+
+
+def write_enrollment_extract(directory_path):
+    write_extract(os.path.join(directory_path, 'ET_RAF_ENROLLMENT_2023.xlsx'), pd.DataFrame([{
+        'ID': row_id, 'HEGIS Code': code, 'Term': 4241, 'Acad Org': 'ORG',
+        'Org Descr': 'Department', 'Acad Group': 'GROUP', 'Pri Prog Camp': campus,
+    } for row_id, code, campus in ENROLLMENT_ROWS]))
+
+
+def write_instructional_effort_folders(ay_root):
+    """
+    The INSTRUCTIONAL EFFORT PART 1 and PART 2 folders of an AY folder, each with its extract and the
+    INSTRUCTIONAL_FTE pivot. Returns the two folder paths.
+    """
+    part_1 = os.path.join(ay_root, 'INSTRUCTIONAL EFFORT PART 1')
+    part_2 = os.path.join(ay_root, 'INSTRUCTIONAL EFFORT PART 2')
+    for directory_path in [part_1, part_2]:
+        os.makedirs(directory_path, exist_ok=True)
+        write_grand_totals(directory_path)
+    write_course_extract(part_1)
+    write_enrollment_extract(part_2)
+    return part_1, part_2
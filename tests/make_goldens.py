@@ -0,0 +1,64 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from extracts import write_instructional_effort_folders
+
+# Regenerates tests/golden from the baseline scripts (the first commit of the repository unless another revision is
+# given): every script is taken from git as it was then, run on the extracts of extracts.py and the sheets listed
+# below are saved as CSV. The tests compare the current scripts against these files.
+# python tests/make_goldens.py [--revision REV]
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_FOLDER = os.path.join(REPOSITORY, 'tests', 'golden')
+
+# (script, folder of write_instructional_effort_folders, workbook it writes there, {sheet: golden file})
+GOLDENS = [
+    ('Instructional Effort part 1.py', 0, 'INSTRUCTIONAL_EFFORT_PART_1.xlsx', {
+        'Pivot Table with Grand Total': 'instructional_effort_part_1_pivot.csv',
+        'Summary Table': 'instructional_effort_part_1_summary.csv',
+    }),
+    ('Instructional Effort part 2.py', 1, 'INSTRUCTIONAL_EFFORT_PART_2.xlsx', {
+        'Pivot Table with Grand Total': 'instructional_effort_part_2_pivot.csv',
+        'Summary Table': 'instructional_effort_part_2_summary.csv',
+    }),
+]
+
+
+def git(*args):
+    return subprocess.run(['git', *args], cwd=REPOSITORY, capture_output=True, check=True).stdout
+
+
+# Function to run a script as it was at revision; the baseline scripts ask for their folder with input()
+def run_baseline_script(script_name, directory_path, revision):
+    with tempfile.TemporaryDirectory() as folder:
+        script_path = os.path.join(folder, 'baseline.py')
+        with open(script_path, 'wb') as script_file:
+            script_file.write(git('show', f'{revision}:{script_name}'))
+        subprocess.run([sys.executable, script_path], input=directory_path + '\n', text=True, check=True,
+                       capture_output=True, cwd=folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the golden CSV files from the baseline scripts.")
+    parser.add_argument('--revision', default=None, help="git revision of the scripts (default: the first commit)")
+    args = parser.parse_args()
+    revision = args.revision or git('rev-list', '--max-parents=0', 'HEAD').decode().split()[0]
+
+    os.makedirs(GOLDEN_FOLDER, exist_ok=True)
+    with tempfile.TemporaryDirectory() as root:
+        folders = write_instructional_effort_folders(os.path.join(root, 'AY_23_24'))
+        for script_name, folder_number, workbook, sheets in GOLDENS:
+            run_baseline_script(script_name, folders[folder_number], revision)
+            for sheet_name, golden_name in sheets.items():
+                df = pd.read_excel(os.path.join(folders[folder_number], workbook), sheet_name=sheet_name)
+                df.to_csv(os.path.join(GOLDEN_FOLDER, golden_name), index=False)
+                print(f"{golden_name}: {sheet_name} of {workbook} from {script_name} at {revision[:10]}")
+
+
+if __name__ == '__main__':
+    main()
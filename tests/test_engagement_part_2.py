@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from rubric_pipeline import load_stage
+from rubric_store import ArtifactStore
+from rubric_totals import campus_rows
+
+CAMPUS = 'Home Campus/Teaching Site (Most Recent)'
+
+# Scheduled Learning rows (HEGIS Code, campus, IMPACT, IMPACT_ASL): H1 has one HIP at 'HBG' and two at 'HBG ', one ASL
+# at each, so once the labels are stripped HBG has HIP.1 = 2 + 4 and ASL = 6 + 6
+SCHEDULED_ROWS = [
+    ('H1', 'HBG', 'yes', 1),
+    ('H1', 'HBG ', 'yes', 1),
+    ('H1', 'HBG ', 'yes', 0),
+    ('H1', 'USMGC', 'yes', 2),
+]
+
+# Directed Service Learning rows (HEGIS Code, campus): one mentored publication at 'HBG' and one at ' HBG'
+DIRECTED_ROWS = [
+    ('H1', 'HBG'),
+    ('H1', ' HBG'),
+]
+
+
+@pytest.fixture
+def hip_b(tmp_path):
+    directory_path = tmp_path / 'AY_23_24' / 'FACULTY SUCCESS'
+    directory_path.mkdir(parents=True)
+    pd.DataFrame(
+        [{'HEGIS Code': code, CAMPUS: campus, 'IMPACT': impact, 'IMPACT_ASL': asl}
+         for code, campus, impact, asl in SCHEDULED_ROWS]
+    ).to_excel(directory_path / 'High_Impact_Practices_Scheduled_Learning_AY_23_24.xlsx',
+               sheet_name='Scheduled Learning', index=False)
+    pd.DataFrame(
+        [{'ID_String': str(number), 'HEGIS Code': code, CAMPUS: campus,
+          'TYPE': 'Mentored Student Publication', 'COMPSTAGE': 'Completed'}
+         for number, (code, campus) in enumerate(DIRECTED_ROWS)]
+    ).to_excel(directory_path / 'High_Impact_Practices_Directed_Service_Learning_AY_23_24.xlsx',
+               sheet_name='High Impact Practices', index=False)
+
+    store = ArtifactStore()
+    load_stage('Engagement Part 2.py').run(str(directory_path), store)
+    return store
+
+
+def test_space_padded_campuses_are_added_up_once(hip_b):
+    merged = hip_b.get('HIP_B', 'Merged Data').set_index(['HEGIS Code', CAMPUS])
+
+    # HIP.1 2 + 4, ASL 6 + 6 and Count 1 + 1: 20, not the sum over every pair of the duplicate rows
+    assert merged.loc[('H1', 'HBG'), ['HIP.1', 'ASL', 'Count', 'sum']].tolist() == [6, 12, 2, 20]
+    assert merged.loc[('H1', 'USMGC'), ['HIP.1', 'ASL', 'Count', 'sum']].tolist() == [2, 12, 0, 14]
+    assert merged.loc[('H1', 'TOTAL'), 'sum'] == 34
+    assert merged.loc[('H1', 'TOTAL'), 'Weighted Sum'] == pytest.approx(34 * 0.175)
+
+    flattened = hip_b.get('HIP_B', 'Flattened Data').set_index('HEGIS Code')
+    assert flattened.loc['H1', 'sum HBG'] == 20
+
+
+def test_campus_rows_refuses_duplicate_campus_rows():
+    df = pd.DataFrame({'HEGIS Code': ['H1', 'H1'], CAMPUS: ['HBG', 'HBG'], 'HIP.1': [2, 4]})
+    with pytest.raises(ValueError, match='H1 / HBG'):
+        campus_rows(df, 'HEGIS Code', CAMPUS, ['HIP.1'])
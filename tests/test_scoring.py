@@ -0,0 +1,156 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from extracts import grand_total_pivot, write_course_extract, write_instructional_effort_folders
+from rubric_pipeline import load_stage
+from rubric_scoring import ratio_where_positive, total_or_value
+from rubric_store import ArtifactStore
+
+# The goldens are the baseline scripts' output on the extracts of extracts.py (python tests/make_goldens.py)
+GOLDEN_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+
+
+def test_total_or_value_takes_the_total_on_total_rows():
+    df = pd.DataFrame({
+        'CAMPUS': ['HBG', 'USMGC', 'total'],
+        'score': [10.0, 6.0, np.nan],
+        'score_total': [16.0, 16.0, 16.0],
+    })
+    result = total_or_value(df, 'CAMPUS', 'total', 'score_total', 'score')
+    assert result.tolist() == [10.0, 6.0, 16.0]
+
+
+def test_ratio_where_positive_fills_zero_missing_and_negative_denominators():
+    numerator = pd.Series([10.0, 6.0, 5.0, 4.0, 3.0])
+    denominator = pd.Series([2.0, 4.0, 0.0, np.nan, -1.0])
+    result = ratio_where_positive(numerator, denominator)
+    assert result.tolist() == [5.0, 1.5, 0.0, 0.0, 0.0]
+    assert np.isfinite(result).all()
+
+
+def test_ratio_where_positive_fill_value():
+    result = ratio_where_positive(pd.Series([1.0, 1.0]), pd.Series([0.0, 4.0]), fill=np.nan)
+    assert np.isnan(result.iloc[0])
+    assert result.iloc[1] == 0.25
+
+
+# Merged tables as the Instructional Effort parts score them: positive, negative, missing and zero Grand Totals
+PART_1_TABLE = pd.DataFrame({
+    'Campus': ['HBG', 'USMGC', '', 'HBG', '', 'HBG', ''],
+    'SCH Score': [10.0, 6.0, np.nan, 5.0, np.nan, 4.0, np.nan],
+    'TOTAL': [np.nan, np.nan, 16.0, np.nan, 5.0, np.nan, 4.0],
+    'Grand Total': [2.0, 2.0, 2.0, -1.0, -1.0, np.nan, np.nan],
+})
+PART_2_TABLE = pd.DataFrame({
+    'ID': [3, 1, 2, 4, 5],
+    'Grand Total': [2.0, 0.0, np.nan, -1.0, 4.0],
+})
+
+
+def test_instructional_effort_part_1_sch_per_fte_matches_the_old_lambda():
+    old = PART_1_TABLE.apply(lambda row: row['TOTAL'] / row['Grand Total'] if row['Campus'] == '' else row['SCH Score'] / row['Grand Total'], axis=1)
+    pd.testing.assert_series_equal(load_stage('Instructional Effort part 1.py').sch_per_fte(PART_1_TABLE), old)
+
+
+def test_instructional_effort_part_1_sch_per_fte_of_a_zero_grand_total():
+    zero_fte = PART_1_TABLE.assign(**{'Grand Total': 0.0})
+    # The old lambda divided the Python floats of apply's object rows and stopped the stage; the division gives inf
+    with pytest.raises(ZeroDivisionError):
+        zero_fte.apply(lambda row: row['TOTAL'] / row['Grand Total'] if row['Campus'] == '' else row['SCH Score'] / row['Grand Total'], axis=1)
+    assert np.isinf(load_stage('Instructional Effort part 1.py').sch_per_fte(zero_fte)).all()
+
+
+def test_instructional_effort_part_2_sch_per_fte_matches_the_old_lambda():
+    old = PART_2_TABLE.apply(lambda row: row['ID'] / row['Grand Total'] if row['Grand Total'] > 0 else 0, axis=1)
+    new = load_stage('Instructional Effort part 2.py').sch_per_fte(PART_2_TABLE)
+    pd.testing.assert_series_equal(new, old)
+    assert new.tolist() == [1.5, 0.0, 0.0, 0.0, 1.25]
+
+
+# The FS_A matrix of Engagement 1.1: TOTAL, HBG and USMGC rows per HEGIS Code (E only has a TOTAL row)
+FS_A_ROWS = [(code, campus) for code in ['A', 'B', 'C'] for campus in ['TOTAL', 'HBG', 'USMGC']] + [('E', 'TOTAL')]
+
+
+# Function to build the old Engagement 1.1 merge (before its apply) for one category's pivot: the campus score of every
+# FS_A row and the HBG + USMGC sum of its HEGIS Code in score_column + suffix
+def old_category_merge(pivot_data, campus_column, score_column, suffix):
+    fs_a_data = pd.DataFrame(FS_A_ROWS, columns=['HEGIS Code', 'CAMPUS'])
+    fs_a_data['CAMPUS'] = fs_a_data['CAMPUS'].str.strip().str.lower()
+    mapped_data = fs_a_data.merge(pivot_data[['HEGIS Code', campus_column, score_column]], how='left',
+                                  left_on=['HEGIS Code', 'CAMPUS'], right_on=['HEGIS Code', campus_column])
+    mapped_data[score_column] = mapped_data[score_column].fillna(0.0)
+    totals = mapped_data[mapped_data['CAMPUS'].isin(['hbg', 'usmgc'])].groupby('HEGIS Code')[score_column].sum().reset_index()
+    return mapped_data.merge(totals, on='HEGIS Code', how='left', suffixes=('', suffix))
+
+
+# Function to build a category pivot as Engagement 1.1 normalizes it: A has a missing USMGC score, B a space-padded
+# mixed-case campus, C no rows
+def category_pivot(campus_column, score_column):
+    pivot_data = pd.DataFrame({
+        'HEGIS Code': ['A', 'A', 'B', 'D'],
+        campus_column: ['HBG', 'USMGC', ' Hbg ', 'HBG'],
+        score_column: [3.0, np.nan, 2.5, 7.0],
+    })
+    pivot_data[campus_column] = pivot_data[campus_column].str.strip().str.lower()
+    return pivot_data
+
+
+@pytest.mark.parametrize('total_column, campus_column, score_column, suffix, old_lambda', [
+    ('AR TOTAL', 'Home Campus/Teaching Site (Most Recent)', 'score', '_total',
+     lambda row: row['score_total'] if row['CAMPUS'] == 'total' else row['score']),
+    ('AWARDS TOTAL', 'Location', 'ID_String_Multiplied', '_awards_total',
+     lambda row: row['ID_String_Multiplied_awards_total'] if row['CAMPUS'] == 'total' else row['ID_String_Multiplied']),
+    ('PRESENTATIONS TOTAL', 'Home Campus/Teaching Site (Most Recent)', 'score', '_total',
+     lambda row: row['score_total'] if row['CAMPUS'] == 'total' else row['score']),
+])
+def test_engagement_1_1_totals_match_the_old_lambdas(total_column, campus_column, score_column, suffix, old_lambda):
+    pivot_data = category_pivot(campus_column, score_column)
+    old = old_category_merge(pivot_data, campus_column, score_column, suffix).apply(old_lambda, axis=1)
+
+    fs_a_data = pd.DataFrame(FS_A_ROWS, columns=['HEGIS Code', 'CAMPUS'])
+    new = load_stage('Engagement 1.1.py').add_category_total(fs_a_data, pivot_data, 'HEGIS Code', campus_column,
+                                                             score_column, total_column)[total_column]
+    pd.testing.assert_series_equal(new, old, check_names=False)
+    # A's TOTAL row is HBG 3 + a missing USMGC score (0); E has no campus rows, so no total
+    assert new.iloc[0] == 3.0
+    assert np.isnan(new.iloc[-1])
+
+
+@pytest.fixture(scope='module')
+def instructional_effort(tmp_path_factory):
+    part_1, part_2 = write_instructional_effort_folders(str(tmp_path_factory.mktemp('root') / 'AY_23_24'))
+
+    # Both parts read the INSTRUCTIONAL_FTE pivot from their folder (the store has none), as the baseline scripts did
+    store = ArtifactStore()
+    load_stage('Instructional Effort part 1.py').run(part_1, store)
+    load_stage('Instructional Effort part 2.py').run(part_2, store)
+    return store
+
+
+@pytest.mark.parametrize('artifact, sheet_name, golden_name', [
+    ('INSTRUCTIONAL_EFFORT_PART_1', 'Pivot Table with Grand Total', 'instructional_effort_part_1_pivot.csv'),
+    ('INSTRUCTIONAL_EFFORT_PART_1', 'Summary Table', 'instructional_effort_part_1_summary.csv'),
+    ('INSTRUCTIONAL_EFFORT_PART_2', 'Pivot Table with Grand Total', 'instructional_effort_part_2_pivot.csv'),
+    ('INSTRUCTIONAL_EFFORT_PART_2', 'Summary Table', 'instructional_effort_part_2_summary.csv'),
+])
+def test_instructional_effort_matches_the_baseline_golden(instructional_effort, artifact, sheet_name, golden_name):
+    golden = pd.read_csv(os.path.join(GOLDEN_FOLDER, golden_name))
+    pd.testing.assert_frame_equal(instructional_effort.get(artifact, sheet_name).reset_index(drop=True), golden,
+                                  check_dtype=False)
+
+
+def test_instructional_effort_part_1_zero_grand_total_gives_inf(tmp_path):
+    directory_path = tmp_path / 'AY_23_24' / 'INSTRUCTIONAL EFFORT PART 1'
+    directory_path.mkdir(parents=True)
+    write_course_extract(str(directory_path))
+
+    store = ArtifactStore()
+    store.put('INSTRUCTIONAL_FTE_4241', {'Pivot Table NEW CALC FTE': grand_total_pivot({'A': 2.0, 'B': 0.0, 'C': 1.0})})
+    load_stage('Instructional Effort part 1.py').run(str(directory_path), store)
+
+    table = store.get('INSTRUCTIONAL_EFFORT_PART_1', 'Pivot Table with Grand Total').set_index('Instr HEGIS Code')
+    assert np.isinf(table.loc['B', ['SCH/FTE', 'Score']].to_numpy()).all()
+    assert table.loc['A', 'SCH/FTE'].tolist() == [8.0, 5.0, 3.0]